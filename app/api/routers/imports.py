@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.models.import_job import ImportJob
+from app.core.logger import setup_logger
+from app.schemas.import_job import ImportJobResponse
+
+logger = setup_logger(__name__)
+router = APIRouter()
+
+@router.get("/imports/{job_id}", response_model=ImportJobResponse)
+def get_import(job_id: str, db: Session = Depends(get_db)):
+    """
+    Obtener el estado y el progreso de un import en segundo plano.
+    """
+    logger.info(f"GET /imports/{job_id}")
+    
+    job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+    
+    if not job:
+        logger.warning(f"Import {job_id} no encontrado")
+        raise HTTPException(status_code=404, detail=f"Import con ID {job_id} no encontrado")
+    
+    return job
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import metrics
+
+router = APIRouter()
+
+# Content-Type del formato de texto de Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Métricas de la aplicación en formato de texto de Prometheus: tiempos por
+    etapa del import, latencia por endpoint, pool de base de datos y cachés.
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas")
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
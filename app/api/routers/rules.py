@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.services.classification_rules import (
+    RuleConflictError,
+    RuleNotFoundError,
+    create_rule,
+    delete_rule,
+    list_rules,
+    update_rule
+)
+from app.core.logger import setup_logger
+from app.schemas.classification_rule import (
+    ClassificationRuleCreate,
+    ClassificationRuleUpdate,
+    ClassificationRuleResponse,
+    ClassificationRuleListResponse
+)
+
+logger = setup_logger(__name__)
+router = APIRouter()
+
+@router.get("/rules", response_model=ClassificationRuleListResponse)
+def get_rules(db: Session = Depends(get_db)):
+    """
+    Listar las keywords del clasificador en orden de prioridad, junto con la
+    versión actual de la tabla de reglas.
+    """
+    logger.info("GET /rules")
+
+    version, rules = list_rules(db)
+    return {"version": version, "rules": rules}
+
+@router.post("/rules", response_model=ClassificationRuleResponse, status_code=201)
+def add_rule(rule: ClassificationRuleCreate, db: Session = Depends(get_db)):
+    """
+    Crear una keyword del clasificador.
+
+    El cambio se aplica a los imports siguientes de todos los workers sin
+    reiniciar; las transacciones ya guardadas se actualizan con
+    POST /transactions/reclassify.
+    """
+    logger.info(f"POST /rules: '{rule.keyword}' -> {rule.category}")
+
+    try:
+        return create_rule(db, rule.category, rule.keyword, rule.priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuleConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.patch("/rules/{rule_id}", response_model=ClassificationRuleResponse)
+def modify_rule(rule_id: int, changes: ClassificationRuleUpdate, db: Session = Depends(get_db)):
+    """
+    Modificar la categoría, la keyword o la prioridad de una regla.
+    """
+    logger.info(f"PATCH /rules/{rule_id}")
+
+    try:
+        return update_rule(db, rule_id, changes.category, changes.keyword, changes.priority)
+    except RuleNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuleConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.delete("/rules/{rule_id}")
+def remove_rule(rule_id: int, db: Session = Depends(get_db)):
+    """
+    Eliminar una regla del clasificador.
+    """
+    logger.info(f"DELETE /rules/{rule_id}")
+
+    try:
+        delete_rule(db, rule_id)
+    except RuleNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {"message": f"Regla {rule_id} eliminada correctamente"}
@@ -1,29 +1,48 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, extract
 from app.db.session import get_db
 from app.models.transaction import Transaction
-from app.services.classifier import classify_transaction
-from app.services.csv_parser import TransactionCSVParser, CSVParseError
+from app.services.csv_parser import CSVParseError
+from app.services.fingerprints import clear_fingerprints
+from app.services.import_jobs import submit_import
+from app.services.batch_importer import import_batch
+from app.services.concept_search import concept_candidate_filters, concept_search_index
+from app.services.importer import ImportStorageError
+from app.services.reclassifier import ReclassificationError, reclassify_transactions
+from app.services.response_cache import response_cache
+from app.services.rollup import apply_rollup_delta, clear_rollup
+from app.services.stats import compute_transaction_stats
+from app.services.transaction_queries import transaction_filters, page_statements, build_page
 from app.core.logger import setup_logger
 from app.schemas.transaction import (
     TransactionResponse, 
     TransactionListResponse, 
-    TransactionStats,
-    CategoryStats,
-    MonthlyStats
+    TransactionStats
 )
-from typing import Optional, List
+from typing import List, Optional
 from datetime import date
 
 logger = setup_logger(__name__)
 router = APIRouter()
+# Endpoints de lectura: main.py registra este router o su equivalente
+# asíncrono (transactions_async.read_router) según ASYNC_DB_ENABLED
+read_router = APIRouter()
 
 @router.post("/upload")
-async def upload_transactions(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_transactions(
+    file: UploadFile = File(...),
+    wait: bool = Query(True, description="Esperar al resultado (true) o devolver solo el ID del import (false)")
+):
     """
     Endpoint para subir transacciones desde un archivo CSV.
     Soporta múltiples formatos automáticamente.
+    
+    El archivo se almacena y se procesa en el pool de imports, fuera del event
+    loop. Con wait=false se responde 202 con el ID del import, cuyo progreso
+    se consulta en GET /imports/{id}.
     """
     logger.info(f"Recibida solicitud de upload: {file.filename}")
     
@@ -33,104 +52,79 @@ async def upload_transactions(file: UploadFile = File(...), db: Session = Depend
         raise HTTPException(status_code=400, detail="El archivo debe ser un CSV")
 
     try:
-        # Leer contenido del archivo
-        contents = await file.read()
-        logger.info(f"Archivo leído: {len(contents)} bytes")
-        
-        # Parsear CSV
-        parser = TransactionCSVParser()
-        try:
-            transactions_data = parser.parse(contents)
-            logger.info(f"CSV parseado exitosamente: {len(transactions_data)} transacciones encontradas")
-        except CSVParseError as e:
-            logger.error(f"Error al parsear CSV: {e}")
-            raise HTTPException(status_code=400, detail=str(e))
-        
-        # Estadísticas
-        stats = {
-            'total': len(transactions_data),
-            'processed': 0,
-            'duplicates': 0,
-            'errors': 0
-        }
-        
-        # Determinar source según el formato detectado
-        source = "csv_bank" if parser.detected_format == parser.BANK_FORMAT_CONFIG else "csv_simple"
-        logger.info(f"Formato detectado: {source}")
-        
-        # Procesar cada transacción
-        for idx, trans_data in enumerate(transactions_data):
-            try:
-                # Verificar duplicados
-                existing = db.query(Transaction).filter(
-                    and_(
-                        Transaction.date == trans_data['date'],
-                        Transaction.concept == trans_data['concept'],
-                        Transaction.amount == trans_data['amount']
-                    )
-                ).first()
-                
-                if existing:
-                    stats['duplicates'] += 1
-                    logger.debug(f"Transacción duplicada ignorada: {trans_data['concept'][:50]} - {trans_data['amount']}€")
-                    continue
-                
-                # Clasificar transacción
-                category = classify_transaction(trans_data['concept'])
-                
-                # Crear nueva transacción
-                transaction = Transaction(
-                    date=trans_data['date'],
-                    concept=trans_data['concept'],
-                    amount=trans_data['amount'],
-                    category=category,
-                    source=source
-                )
-                
-                db.add(transaction)
-                stats['processed'] += 1
-                
-                logger.debug(f"Transacción {idx + 1}/{stats['total']} procesada: {trans_data['concept'][:50]} - {category}")
-                
-            except Exception as e:
-                stats['errors'] += 1
-                logger.error(f"Error al procesar transacción {idx + 1}: {e}")
-                # Continuar con las demás transacciones
-        
-        # Commit de todas las transacciones
-        try:
-            db.commit()
-            logger.info(f"Transacciones guardadas en base de datos: {stats['processed']} nuevas")
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error al guardar en base de datos: {e}")
-            raise HTTPException(status_code=500, detail=f"Error al guardar transacciones: {str(e)}")
-        
-        # Respuesta con estadísticas
-        response = {
-            "message": f"Procesamiento completado",
-            "statistics": {
-                "total_rows": stats['total'],
-                "new_transactions": stats['processed'],
-                "duplicates_skipped": stats['duplicates'],
-                "errors": stats['errors']
-            },
-            "format_detected": source
-        }
-        
-        logger.info(f"Upload completado exitosamente: {response}")
-        return response
-
-    except HTTPException:
-        # Re-lanzar HTTPExceptions
-        raise
+        job_id, future = await run_in_threadpool(submit_import, file.filename, file.file)
+    except Exception as e:
+        logger.error(f"Error al registrar el import: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error al procesar el archivo: {str(e)}")
+    
+    if not wait:
+        return JSONResponse(
+            status_code=202,
+            content={"message": "Import encolado", "job_id": job_id, "status_url": f"/api/v1/imports/{job_id}"}
+        )
+    
+    try:
+        response = await asyncio.wrap_future(future)
+    except CSVParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportStorageError as e:
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error(f"Error inesperado al procesar archivo: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error al procesar el archivo: {str(e)}")
+    
+    logger.info(f"Upload completado exitosamente: {response}")
+    return {**response, "job_id": job_id}
+
+
+@router.post("/upload/batch")
+async def upload_transactions_batch(files: List[UploadFile] = File(...), db: Session = Depends(get_db)):
+    """
+    Endpoint para subir varios archivos CSV (o ZIP con CSV) en una sola petición.
+    Los archivos se parsean en paralelo y se guardan en una única transacción,
+    deduplicando también entre archivos. Devuelve estadísticas por archivo.
+    """
+    logger.info(f"Recibida solicitud de upload por lotes: {len(files)} archivos")
+    
+    named_files = [(file.filename, await file.read()) for file in files]
+    
+    try:
+        response = await run_in_threadpool(import_batch, db, named_files)
+    except CSVParseError as e:
+        logger.error(f"Error al parsear el lote: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportStorageError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error inesperado al procesar el lote: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error al procesar los archivos: {str(e)}")
+    
+    logger.info(f"Upload por lotes completado: {response['statistics']}")
+    return response
+
+
+@router.post("/transactions/reclassify")
+def reclassify(db: Session = Depends(get_db)):
+    """
+    Reclasificar todas las transacciones con la tabla de keywords vigente.
+    
+    Solo se actualizan las filas cuya categoría cambia; la respuesta indica
+    cuántas filas ganó y perdió cada categoría.
+    """
+    logger.info("POST /transactions/reclassify")
+    
+    try:
+        response = reclassify_transactions(db)
+    except ReclassificationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    logger.info(f"Reclasificación completada: {response['statistics']}")
+    return response
 
 
-@router.get("/transactions", response_model=TransactionListResponse)
+@read_router.get("/transactions", response_model=TransactionListResponse)
 def get_transactions(
+    request: Request,
     skip: int = Query(0, ge=0, description="Número de registros a saltar"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
     start_date: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
@@ -138,46 +132,49 @@ def get_transactions(
     category: Optional[str] = Query(None, description="Filtrar por categoría"),
     min_amount: Optional[float] = Query(None, description="Monto mínimo"),
     max_amount: Optional[float] = Query(None, description="Monto máximo"),
+    cursor: Optional[str] = Query(None, description="Cursor 'next_cursor' de la página anterior (ignora skip)"),
+    include_total: bool = Query(True, description="Calcular el total de registros que cumplen los filtros"),
+    q: Optional[str] = Query(None, min_length=1, max_length=200, description="Texto contenido en el concepto"),
     db: Session = Depends(get_db)
 ):
     """
     Obtener lista de transacciones con filtros opcionales y paginación.
-    """
-    logger.info(f"GET /transactions - skip={skip}, limit={limit}, filters: start_date={start_date}, end_date={end_date}, category={category}")
-    
-    # Construir query base
-    query = db.query(Transaction)
-    
-    # Aplicar filtros
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    if category:
-        query = query.filter(Transaction.category == category)
-    if min_amount is not None:
-        query = query.filter(Transaction.amount >= min_amount)
-    if max_amount is not None:
-        query = query.filter(Transaction.amount <= max_amount)
     
-    # Contar total
-    total = query.count()
+    Soporta paginación por offset (skip/limit) y por cursor sobre (date, id):
+    cada respuesta incluye next_cursor para pedir la página siguiente sin
+    recorrer las anteriores. Con q se buscan las transacciones cuyo concepto
+    contiene el texto, combinable con el resto de filtros.
+    """
+    logger.info(f"GET /transactions - skip={skip}, limit={limit}, cursor={cursor}, filters: start_date={start_date}, end_date={end_date}, category={category}, q={q}")
     
-    # Aplicar ordenamiento y paginación
-    transactions = query.order_by(Transaction.date.desc()).offset(skip).limit(limit).all()
+    params = {
+        'skip': skip, 'limit': limit, 'start_date': start_date, 'end_date': end_date,
+        'category': category, 'min_amount': min_amount, 'max_amount': max_amount,
+        'cursor': cursor, 'include_total': include_total, 'q': q
+    }
     
-    logger.info(f"Retornando {len(transactions)} transacciones de {total} totales")
+    def compute() -> TransactionListResponse:
+        try:
+            count_statement, page_statement = page_statements(
+                transaction_filters(start_date, end_date, category, min_amount, max_amount, q)
+                + concept_candidate_filters(db, q),
+                skip, limit, cursor, include_total
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        total = db.execute(count_statement).scalar() if count_statement is not None else None
+        transactions = db.execute(page_statement).scalars().all()
+        
+        logger.info(f"Retornando {min(len(transactions), limit)} transacciones de {total} totales")
+        return build_page(transactions, total, skip, limit, cursor)
     
-    return TransactionListResponse(
-        transactions=transactions,
-        total=total,
-        skip=skip,
-        limit=limit
-    )
+    return response_cache.respond(request, "transactions", params, compute)
 
 
-@router.get("/transactions/stats", response_model=TransactionStats)
+@read_router.get("/transactions/stats", response_model=TransactionStats)
 def get_transaction_stats(
+    request: Request,
     start_date: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
     db: Session = Depends(get_db)
@@ -187,85 +184,33 @@ def get_transaction_stats(
     """
     logger.info(f"GET /transactions/stats - start_date={start_date}, end_date={end_date}")
     
-    # Query base
-    query = db.query(Transaction)
-    
-    # Aplicar filtros de fecha
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    
-    # Totales generales
-    total_transactions = query.count()
+    def compute() -> TransactionStats:
+        stats = compute_transaction_stats(db, start_date, end_date)
+        logger.info(f"Estadísticas calculadas: {stats.total_transactions} transacciones, {len(stats.by_category)} categorías, {len(stats.by_month)} meses")
+        return stats
     
-    # Calcular ingresos y gastos
-    all_transactions = query.all()
-    total_income = sum(t.amount for t in all_transactions if t.amount > 0)
-    total_expenses = sum(t.amount for t in all_transactions if t.amount < 0)
-    net_balance = total_income + total_expenses
-    
-    # Estadísticas por categoría
-    category_stats_query = query.with_entities(
-        Transaction.category,
-        func.count(Transaction.id).label('count'),
-        func.sum(Transaction.amount).label('total'),
-        func.avg(Transaction.amount).label('average')
-    ).group_by(Transaction.category).all()
-    
-    by_category = [
-        CategoryStats(
-            category=cat or "Sin categoría",
-            count=count,
-            total=round(total, 2),
-            average=round(average, 2)
-        )
-        for cat, count, total, average in category_stats_query
-    ]
-    
-    # Estadísticas por mes
-    monthly_stats_query = query.with_entities(
-        func.to_char(Transaction.date, 'YYYY-MM').label('month'),
-        func.count(Transaction.id).label('count'),
-        func.sum(Transaction.amount).label('total')
-    ).group_by(func.to_char(Transaction.date, 'YYYY-MM')).order_by(func.to_char(Transaction.date, 'YYYY-MM')).all()
-    
-    by_month = [
-        MonthlyStats(
-            month=month,
-            count=count,
-            total=round(total, 2)
-        )
-        for month, count, total in monthly_stats_query
-    ]
-    
-    logger.info(f"Estadísticas calculadas: {total_transactions} transacciones, {len(by_category)} categorías, {len(by_month)} meses")
-    
-    return TransactionStats(
-        total_transactions=total_transactions,
-        total_income=round(total_income, 2),
-        total_expenses=round(total_expenses, 2),
-        net_balance=round(net_balance, 2),
-        by_category=by_category,
-        by_month=by_month
-    )
+    params = {'start_date': start_date, 'end_date': end_date}
+    return response_cache.respond(request, "transactions_stats", params, compute)
 
 
-@router.get("/transactions/{transaction_id}", response_model=TransactionResponse)
-def get_transaction(transaction_id: int, db: Session = Depends(get_db)):
+@read_router.get("/transactions/{transaction_id}", response_model=TransactionResponse)
+def get_transaction(transaction_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Obtener una transacción específica por ID.
     """
     logger.info(f"GET /transactions/{transaction_id}")
     
-    transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
-    
-    if not transaction:
-        logger.warning(f"Transacción {transaction_id} no encontrada")
-        raise HTTPException(status_code=404, detail=f"Transacción con ID {transaction_id} no encontrada")
+    def compute() -> TransactionResponse:
+        transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+        
+        if not transaction:
+            logger.warning(f"Transacción {transaction_id} no encontrada")
+            raise HTTPException(status_code=404, detail=f"Transacción con ID {transaction_id} no encontrada")
+        
+        logger.info(f"Transacción {transaction_id} encontrada: {transaction.concept[:50]}")
+        return TransactionResponse.model_validate(transaction)
     
-    logger.info(f"Transacción {transaction_id} encontrada: {transaction.concept[:50]}")
-    return transaction
+    return response_cache.respond(request, "transaction", {'id': transaction_id}, compute)
 
 
 @router.delete("/transactions/{transaction_id}")
@@ -282,8 +227,16 @@ def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail=f"Transacción con ID {transaction_id} no encontrada")
     
     concept = transaction.concept[:50]
+    apply_rollup_delta(
+        db,
+        [{'date': transaction.date, 'category': transaction.category, 'amount_cents': transaction.amount_cents}],
+        direction=-1
+    )
     db.delete(transaction)
+    clear_fingerprints(db)
     db.commit()
+    response_cache.invalidate()
+    concept_search_index.invalidate()
     
     logger.info(f"Transacción {transaction_id} eliminada: {concept}")
     return {"message": f"Transacción {transaction_id} eliminada exitosamente", "deleted_id": transaction_id}
@@ -307,7 +260,11 @@ def delete_all_transactions(
     
     count = db.query(Transaction).count()
     db.query(Transaction).delete()
+    clear_rollup(db)
+    clear_fingerprints(db)
     db.commit()
+    response_cache.invalidate()
+    concept_search_index.invalidate()
     
     logger.warning(f"TODAS las transacciones eliminadas: {count} registros")
     return {"message": f"Todas las transacciones eliminadas exitosamente", "deleted_count": count}
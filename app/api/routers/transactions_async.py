@@ -0,0 +1,112 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
+from app.models.transaction import Transaction
+from app.services.response_cache import response_cache
+from app.services.stats import compute_transaction_stats_async
+from app.services.transaction_queries import transaction_filters, page_statements, build_page
+from app.core.logger import setup_logger
+from app.schemas.transaction import (
+    TransactionResponse,
+    TransactionListResponse,
+    TransactionStats
+)
+from typing import Optional
+from datetime import date
+
+logger = setup_logger(__name__)
+# Versión asíncrona (AsyncSession + asyncpg) de transactions.read_router.
+# Mismas rutas, parámetros, consultas y caché de respuestas.
+read_router = APIRouter()
+
+@read_router.get("/transactions", response_model=TransactionListResponse)
+async def get_transactions(
+    request: Request,
+    skip: int = Query(0, ge=0, description="Número de registros a saltar"),
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a retornar"),
+    start_date: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    category: Optional[str] = Query(None, description="Filtrar por categoría"),
+    min_amount: Optional[float] = Query(None, description="Monto mínimo"),
+    max_amount: Optional[float] = Query(None, description="Monto máximo"),
+    cursor: Optional[str] = Query(None, description="Cursor 'next_cursor' de la página anterior (ignora skip)"),
+    include_total: bool = Query(True, description="Calcular el total de registros que cumplen los filtros"),
+    q: Optional[str] = Query(None, min_length=1, max_length=200, description="Texto contenido en el concepto"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtener lista de transacciones con filtros opcionales y paginación.
+    
+    Soporta paginación por offset (skip/limit) y por cursor sobre (date, id):
+    cada respuesta incluye next_cursor para pedir la página siguiente sin
+    recorrer las anteriores. Con q se buscan las transacciones cuyo concepto
+    contiene el texto, combinable con el resto de filtros.
+    """
+    logger.info(f"GET /transactions (async) - skip={skip}, limit={limit}, cursor={cursor}, filters: start_date={start_date}, end_date={end_date}, category={category}, q={q}")
+    
+    params = {
+        'skip': skip, 'limit': limit, 'start_date': start_date, 'end_date': end_date,
+        'category': category, 'min_amount': min_amount, 'max_amount': max_amount,
+        'cursor': cursor, 'include_total': include_total, 'q': q
+    }
+    
+    async def compute() -> TransactionListResponse:
+        try:
+            count_statement, page_statement = page_statements(
+                transaction_filters(start_date, end_date, category, min_amount, max_amount, q),
+                skip, limit, cursor, include_total
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        total = (await db.execute(count_statement)).scalar() if count_statement is not None else None
+        transactions = (await db.execute(page_statement)).scalars().all()
+        
+        logger.info(f"Retornando {min(len(transactions), limit)} transacciones de {total} totales")
+        return build_page(transactions, total, skip, limit, cursor)
+    
+    return await response_cache.respond_async(request, "transactions", params, compute)
+
+
+@read_router.get("/transactions/stats", response_model=TransactionStats)
+async def get_transaction_stats(
+    request: Request,
+    start_date: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtener estadísticas agregadas de las transacciones.
+    """
+    logger.info(f"GET /transactions/stats (async) - start_date={start_date}, end_date={end_date}")
+    
+    async def compute() -> TransactionStats:
+        stats = await compute_transaction_stats_async(db, start_date, end_date)
+        logger.info(f"Estadísticas calculadas: {stats.total_transactions} transacciones, {len(stats.by_category)} categorías, {len(stats.by_month)} meses")
+        return stats
+    
+    params = {'start_date': start_date, 'end_date': end_date}
+    return await response_cache.respond_async(request, "transactions_stats", params, compute)
+
+
+@read_router.get("/transactions/{transaction_id}", response_model=TransactionResponse)
+async def get_transaction(transaction_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Obtener una transacción específica por ID.
+    """
+    logger.info(f"GET /transactions/{transaction_id} (async)")
+    
+    async def compute() -> TransactionResponse:
+        transaction = (
+            await db.execute(select(Transaction).where(Transaction.id == transaction_id))
+        ).scalars().first()
+        
+        if not transaction:
+            logger.warning(f"Transacción {transaction_id} no encontrada")
+            raise HTTPException(status_code=404, detail=f"Transacción con ID {transaction_id} no encontrada")
+        
+        logger.info(f"Transacción {transaction_id} encontrada: {transaction.concept[:50]}")
+        return TransactionResponse.model_validate(transaction)
+    
+    return await response_cache.respond_async(request, "transaction", {'id': transaction_id}, compute)
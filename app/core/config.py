@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,11 +7,80 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_HOST: str
     POSTGRES_PORT: str
+    # URL completa de SQLAlchemy que sustituye a la de PostgreSQL (p. ej.
+    # sqlite:///bench.db para los benchmarks); el motor asíncrono no la usa
+    DATABASE_URL_OVERRIDE: Optional[str] = None
+
+    # Pool de conexiones (motor síncrono y asíncrono)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # segundos
+    DB_POOL_TIMEOUT: int = 30  # segundos
+    # Servir los endpoints de lectura con AsyncSession (requiere asyncpg)
+    ASYNC_DB_ENABLED: bool = False
+
+    # Filas del CSV que se parsean y guardan por bloque en /upload
+    UPLOAD_CHUNK_SIZE: int = 5000
+    # Filas por sentencia INSERT multi-fila al guardar transacciones
+    INSERT_BATCH_SIZE: int = 1000
+    # Filas leídas por lote (cursor de servidor) al reclasificar transacciones
+    RECLASSIFY_BATCH_SIZE: int = 5000
+    # Conceptos distintos que recuerda la caché LRU del clasificador
+    CLASSIFIER_CACHE_SIZE: int = 10000
+    # Imports en segundo plano: hilos simultáneos y directorio de archivos pendientes
+    IMPORT_WORKERS: int = 2
+    IMPORT_DIR: str = "uploads"
+    # Al arrancar, marcar como fallidos los imports pendientes o en curso y
+    # borrar sus archivos. Desactivar si los workers se reinician por separado
+    # (p. ej. --max-requests), porque cerraría los imports de otros workers
+    IMPORT_RECOVER_ON_STARTUP: bool = True
+    # Registro de huellas SHA-256 para no reprocesar archivos ya importados
+    IMPORT_FINGERPRINTS_ENABLED: bool = True
+    # Procesos para parsear /upload/batch en paralelo (0 = número de CPUs)
+    BATCH_PARSE_WORKERS: int = 0
+    # Límites de tamaño descomprimido de los ZIP de /upload/batch (por CSV y total)
+    BATCH_ZIP_MEMBER_MAX_BYTES: int = 50 * 1024 * 1024
+    BATCH_ZIP_TOTAL_MAX_BYTES: int = 200 * 1024 * 1024
+
+    # Logs: formato JSON y muestreo de los mensajes por fila de cada import
+    # (los primeros N completos, después uno de cada M; 0 = ninguno)
+    LOG_JSON: bool = False
+    LOG_ROW_SAMPLE_FIRST: int = 20
+    LOG_ROW_SAMPLE_EVERY: int = 100
+
+    # Métricas en formato Prometheus expuestas en /metrics
+    METRICS_ENABLED: bool = True
+
+    # Caché de respuestas de los endpoints de lectura
+    CACHE_ENABLED: bool = True
+    # 'memory' (un worker) o 'redis' (varios workers); 'redis' necesita el
+    # paquete opcional redis (pip install redis), que no está en requirements.txt
+    CACHE_BACKEND: str = "memory"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_TTL_SECONDS: int = 60
+    CACHE_MAX_ENTRIES: int = 1000
 
     @property
     def DATABASE_URL(self) -> str:
+        if self.DATABASE_URL_OVERRIDE:
+            return self.DATABASE_URL_OVERRIDE
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
+    @property
+    def DB_POOL_OPTIONS(self) -> dict:
+        return {
+            'pool_size': self.DB_POOL_SIZE,
+            'max_overflow': self.DB_MAX_OVERFLOW,
+            'pool_pre_ping': self.DB_POOL_PRE_PING,
+            'pool_recycle': self.DB_POOL_RECYCLE,
+            'pool_timeout': self.DB_POOL_TIMEOUT
+        }
+
     class Config:
         env_file = ".env"
 
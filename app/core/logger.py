@@ -1,7 +1,16 @@
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Iterator, List, Optional
 
 # Crear directorio de logs si no existe
 LOG_DIR = Path("logs")
@@ -11,45 +20,276 @@ LOG_DIR.mkdir(exist_ok=True)
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# extra de los mensajes que se emiten por cada fila (sujetos a muestreo):
+# logger.warning(msg, extra=PER_ROW)
+PER_ROW = {'per_row': True}
+
+
+class JSONFormatter(logging.Formatter):
+    """Formatea cada registro como un objeto JSON en una sola línea."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'function': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage()
+        }
+        scope = getattr(record, 'log_scope', None)
+        if scope is not None:
+            entry['scope'] = scope
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _RowScope:
+    """Contadores de los mensajes por fila de un import."""
+
+    def __init__(self, name: str, first: int, every: int):
+        self.name = name
+        self.first = first
+        self.every = every
+        self.seen = 0
+        self.suppressed = 0
+
+    def allow(self) -> bool:
+        self.seen += 1
+        if self.seen <= self.first or (self.every > 0 and (self.seen - self.first) % self.every == 0):
+            return True
+        self.suppressed += 1
+        return False
+
+
+_row_scope: ContextVar[Optional[_RowScope]] = ContextVar('row_log_scope', default=None)
+
+
+class _RowSamplingFilter(logging.Filter):
+    """
+    Muestrea los mensajes marcados con PER_ROW dentro de un row_log_scope y
+    etiqueta el resto de registros del ámbito con su nombre. Se ejecuta en el
+    hilo que emite el log, antes de encolarlo.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        scope = _row_scope.get()
+        if scope is None:
+            return True
+        record.log_scope = scope.name
+        return not getattr(record, 'per_row', False) or scope.allow()
+
+
+class _LogBackend:
+    """
+    Cola compartida por todos los loggers de la aplicación y QueueListener
+    que escribe en archivo y consola desde un hilo en segundo plano, de modo
+    que los hilos de las peticiones nunca esperan al disco.
+    """
+
+    def __init__(self):
+        self.json_format = False
+        self.row_sample_first = 20
+        self.row_sample_every = 100
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.queue = queue.SimpleQueue()
+        self.handler = _ProcessAwareQueueHandler(self)
+        self.handler.addFilter(_RowSamplingFilter())
+        self.listener: Optional[QueueListener] = None
+        self.pid = None
+        # Reenvío de los logs de procesos hijos (cola multiprocessing)
+        self.worker_listener: Optional[QueueListener] = None
+        self.forwarding = False
+
+    def _build_handlers(self) -> List[logging.Handler]:
+        formatter = JSONFormatter() if self.json_format else logging.Formatter(LOG_FORMAT, DATE_FORMAT)
+
+        # Handler para archivo con rotación
+        file_handler = RotatingFileHandler(
+            LOG_DIR / "app.log",
+            maxBytes=10 * 1024 * 1024,  # 10MB
+            backupCount=5,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(formatter)
+
+        # Handler para consola
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        return [file_handler, console_handler]
+
+    def ensure_started(self) -> None:
+        """Arranca el hilo escritor en este proceso si aún no está en marcha."""
+        if self.forwarding or self.pid == os.getpid():
+            return
+        with self._lock:
+            if self.pid == os.getpid():
+                return
+            self.listener = QueueListener(self.queue, *self._build_handlers())
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def worker_queue(self, context) -> Any:
+        """
+        Cola multiprocessing para los procesos hijos; un hilo de este proceso
+        pasa sus registros al escritor, de modo que solo el proceso principal
+        escribe y rota logs/app.log.
+        """
+        with self._lock:
+            if self.worker_listener is None:
+                self.worker_listener = QueueListener(context.Queue(), self.handler)
+                self.worker_listener.start()
+            return self.worker_listener.queue
+
+    def forward_to(self, worker_queue) -> None:
+        """En un proceso hijo: envía los registros a la cola del proceso padre."""
+        self.queue = worker_queue
+        self.handler.queue = worker_queue
+        self.forwarding = True
+
+    def stop(self) -> None:
+        """Vacía la cola, detiene el hilo escritor y cierra los archivos."""
+        if self.worker_listener is not None:
+            self.worker_listener.stop()
+            self.worker_listener = None
+        with self._lock:
+            if self.listener is None or self.pid != os.getpid():
+                return
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+            self.pid = None
+
+    def after_fork(self) -> None:
+        # Los hilos no sobreviven a fork: el proceso hijo (p. ej. el pool de
+        # /upload/batch) usa su propia cola y arranca su escritor al primer log
+        self._lock = threading.Lock()
+        previous = self.handler
+        self._reset()
+        for logger in list(logging.root.manager.loggerDict.values()):
+            if isinstance(logger, logging.Logger) and previous in logger.handlers:
+                logger.removeHandler(previous)
+                logger.addHandler(self.handler)
+
+
+class _ProcessAwareQueueHandler(QueueHandler):
+    """QueueHandler que arranca el escritor del proceso en el primer mensaje."""
+
+    def __init__(self, backend: _LogBackend):
+        super().__init__(backend.queue)
+        self.backend = backend
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.backend.ensure_started()
+        super().enqueue(record)
+
+
+_backend = _LogBackend()
+atexit.register(_backend.stop)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_backend.after_fork)
+
+
+def configure_logging(json_format: bool = False, row_sample_first: int = 20, row_sample_every: int = 100) -> None:
+    """
+    Configura el backend de logs de la aplicación. Si el escritor ya está en
+    marcha se reinicia con los nuevos formatos.
+
+    Args:
+        json_format: Escribir cada registro como JSON en lugar de texto
+        row_sample_first: Mensajes por fila que se registran completos en cada
+            import antes de empezar a muestrear
+        row_sample_every: A partir de ahí se registra uno de cada N mensajes
+            por fila (0 = ninguno)
+    """
+    _backend.json_format = json_format
+    _backend.row_sample_first = row_sample_first
+    _backend.row_sample_every = row_sample_every
+    if _backend.listener is not None:
+        _backend.stop()
+        _backend.ensure_started()
+
+
+def worker_log_queue(context) -> Any:
+    """
+    Cola por la que los procesos de un pool envían sus logs a este proceso.
+    Se pasa a init_worker_logging como initializer del pool.
+
+    Args:
+        context: Contexto de multiprocessing del pool (p. ej. spawn)
+
+    Returns:
+        Cola multiprocessing compartida por todos los pools
+    """
+    return _backend.worker_queue(context)
+
+
+def init_worker_logging(log_queue, row_sample_first: int = 20, row_sample_every: int = 100) -> None:
+    """
+    Initializer de los procesos de un pool: sus registros se envían al
+    proceso padre por log_queue en lugar de arrancar un escritor propio, de
+    modo que no se pierden al terminar el proceso ni rotan el mismo archivo.
+    El muestreo por fila se aplica en el proceso hijo.
+
+    Args:
+        log_queue: Cola devuelta por worker_log_queue
+        row_sample_first: Ver configure_logging
+        row_sample_every: Ver configure_logging
+    """
+    _backend.row_sample_first = row_sample_first
+    _backend.row_sample_every = row_sample_every
+    _backend.forward_to(log_queue)
+
+
+def stop_logging() -> None:
+    """Escribe los mensajes pendientes y detiene el hilo escritor."""
+    _backend.stop()
+
+
+@contextmanager
+def row_log_scope(name: str) -> Iterator[None]:
+    """
+    Ámbito de muestreo de los mensajes por fila (extra=PER_ROW) de un import:
+    se registran los primeros row_sample_first y después uno de cada
+    row_sample_every. Al salir se informa de los omitidos.
+
+    Args:
+        name: Nombre del ámbito (p. ej. el ID del import o el archivo)
+    """
+    scope = _RowScope(name, _backend.row_sample_first, _backend.row_sample_every)
+    token = _row_scope.set(scope)
+    try:
+        yield
+    finally:
+        _row_scope.reset(token)
+        if scope.suppressed:
+            app_logger.info(f"{name}: {scope.suppressed} de {scope.seen} mensajes por fila omitidos por muestreo")
+
+
 def setup_logger(name: str, level: int = logging.INFO) -> logging.Logger:
     """
-    Configura un logger con handlers para archivo y consola.
-    
+    Configura un logger que envía sus registros a la cola compartida; un hilo
+    en segundo plano los escribe en archivo y consola.
+
     Args:
         name: Nombre del logger (generalmente __name__ del módulo)
         level: Nivel de logging (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-    
+
     Returns:
         Logger configurado
     """
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    
+
     # Evitar duplicar handlers si ya existe
     if logger.handlers:
         return logger
-    
-    # Handler para archivo con rotación
-    file_handler = RotatingFileHandler(
-        LOG_DIR / "app.log",
-        maxBytes=10 * 1024 * 1024,  # 10MB
-        backupCount=5,
-        encoding='utf-8'
-    )
-    file_handler.setLevel(level)
-    file_formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
-    file_handler.setFormatter(file_formatter)
-    
-    # Handler para consola
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
-    console_handler.setFormatter(console_formatter)
-    
-    # Añadir handlers al logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+
+    logger.addHandler(_backend.handler)
+
     return logger
 
 # Logger por defecto para la aplicación
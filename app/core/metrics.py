@@ -0,0 +1,258 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Límites de los buckets de latencia, en segundos
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Muestra de una métrica: (sufijo del nombre, etiquetas, valor)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Etiquetas en formato de texto de Prometheus: {a="1",b="2"}."""
+    if not labels:
+        return ''
+    escaped = (
+        name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Valor numérico en formato de Prometheus (enteros sin decimales)."""
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Contador monótono con etiquetas (el nombre termina en _total)."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        self.enabled = True
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Incrementa el contador.
+
+        Args:
+            amount: Cantidad a sumar
+            **labels: Valor de cada etiqueta declarada
+        """
+        if not self.enabled:
+            return
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield '', dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Histograma de buckets acumulativos con etiquetas."""
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # clave de etiquetas -> [conteos por bucket (+ el de +Inf), suma]
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+        self.enabled = True
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Registra una observación.
+
+        Args:
+            value: Valor observado (segundos en los histogramas de latencia)
+            **labels: Valor de cada etiqueta declarada
+        """
+        if not self.enabled:
+            return
+        key = tuple(labels[name] for name in self.labelnames)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Mide la duración del bloque y la registra como observación."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield '_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+            yield '_sum', labels, total
+            yield '_count', labels, cumulative
+
+
+class GaugeCallback:
+    """Gauge cuyo valor se calcula en cada lectura de /metrics."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], List[Tuple[Dict[str, str], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def samples(self) -> Iterator[Sample]:
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.warning(f"No se pudo leer la métrica {self.name}: {e}")
+            return
+        for labels, value in values:
+            yield '', labels, value
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas de la aplicación exportadas en formato de texto de
+    Prometheus.
+
+    Contadores e histogramas se actualizan en memoria con un lock por métrica
+    (una búsqueda en diccionario y una suma por observación); los gauges se
+    calculan solo al leer /metrics. Con METRICS_ENABLED=false las
+    observaciones no hacen nada.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            if hasattr(metric, 'enabled'):
+                metric.enabled = self.enabled
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], List[Tuple[Dict[str, str], float]]]
+    ) -> GaugeCallback:
+        """
+        Registra un gauge calculado al leer /metrics.
+
+        Args:
+            name: Nombre de la métrica
+            documentation: Descripción (línea HELP)
+            callback: Función sin argumentos que devuelve [(etiquetas, valor)]
+
+        Returns:
+            Gauge registrado
+        """
+        return self._register(GaugeCallback(name, documentation, callback))
+
+    def render(self) -> str:
+        """
+        Exporta todas las métricas en formato de texto de Prometheus 0.0.4.
+
+        Returns:
+            Texto de la exposición
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+# Métricas comunes de la aplicación
+http_request_duration = metrics.histogram(
+    'http_request_duration_seconds',
+    "Latencia de las peticiones HTTP por endpoint",
+    ('method', 'route', 'status')
+)
+import_stage_duration = metrics.histogram(
+    'import_stage_duration_seconds',
+    "Tiempo de cada etapa del import de CSV (por archivo o por bloque)",
+    ('stage',)
+)
+import_rows = metrics.counter(
+    'import_rows_total',
+    "Filas de CSV importadas por resultado",
+    ('result',)
+)
+
+
+def stage_timer(stage: str):
+    """
+    Mide una etapa del import: detect, fingerprint, parse, classify, dedup o
+    persist (por bloque de UPLOAD_CHUNK_SIZE filas), o batch_parse (detección
+    y parsing en paralelo de todos los archivos de un /upload/batch).
+
+    Args:
+        stage: Nombre de la etapa
+
+    Returns:
+        Context manager que registra la duración del bloque
+    """
+    return import_stage_duration.time(stage=stage)
@@ -0,0 +1,205 @@
+from sqlalchemy import bindparam, inspect, select, text
+from sqlalchemy.engine import Engine
+from app.db.session import Base
+from app.services.dedup import dedup_key
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Filas por lote al rellenar dedup_key en bases de datos existentes
+DEDUP_KEY_BACKFILL_BATCH_SIZE = 5000
+
+
+def create_missing_indexes(engine: Engine) -> None:
+    """
+    Crea los índices declarados en los modelos que aún no existen.
+
+    Base.metadata.create_all solo crea los índices de tablas nuevas; las
+    bases de datos creadas con versiones anteriores necesitan este paso para
+    recibir los índices añadidos después.
+
+    Args:
+        engine: Engine de SQLAlchemy
+    """
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
+
+def migrate_amounts_to_cents(engine: Engine) -> None:
+    """
+    Convierte transactions.amount (FLOAT) en amount_cents (BIGINT) en las
+    bases de datos creadas con versiones anteriores.
+
+    Los montos se redondean al céntimo, se eliminan los duplicados exactos
+    que la comparación en float dejaba pasar (se conserva el de menor id) para
+    poder crear el índice único, y se elimina la columna antigua. El agregado
+    transaction_rollups se vuelve a crear con totales en céntimos y se
+    reconstruye en el arranque.
+
+    Args:
+        engine: Engine de SQLAlchemy
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table("transactions"):
+        return
+    columns = {column['name'] for column in inspector.get_columns("transactions")}
+    if "amount" not in columns:
+        return
+
+    logger.info("Migrando transactions.amount a céntimos enteros (amount_cents)")
+    with engine.begin() as connection:
+        if "amount_cents" not in columns:
+            connection.execute(text("ALTER TABLE transactions ADD COLUMN amount_cents BIGINT"))
+        connection.execute(text(
+            "UPDATE transactions SET amount_cents = CAST(ROUND(amount * 100) AS BIGINT) WHERE amount_cents IS NULL"
+        ))
+        deleted = connection.execute(text(
+            "DELETE FROM transactions WHERE id NOT IN "
+            "(SELECT MIN(id) FROM transactions GROUP BY date, concept, amount_cents)"
+        )).rowcount
+        connection.execute(text("DROP INDEX IF EXISTS idx_transaction_unique"))
+        connection.execute(text("ALTER TABLE transactions DROP COLUMN amount"))
+        if engine.dialect.name == "postgresql":
+            connection.execute(text("ALTER TABLE transactions ALTER COLUMN amount_cents SET NOT NULL"))
+        connection.execute(text("DROP TABLE IF EXISTS transaction_rollups"))
+    Base.metadata.tables["transaction_rollups"].create(bind=engine)
+    logger.info(f"Montos migrados a céntimos ({deleted} duplicados eliminados)")
+
+
+def migrate_dedup_key(engine: Engine) -> None:
+    """
+    Añade transactions.dedup_key en las bases de datos creadas con versiones
+    anteriores y la rellena por lotes con el mismo hash que calcula el parser.
+
+    Tras el relleno se eliminan las claves repetidas (se conserva la de menor
+    id) y se sustituye el índice único compuesto idx_transaction_unique por
+    idx_transaction_dedup_key, que crea create_missing_indexes.
+
+    Args:
+        engine: Engine de SQLAlchemy
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table("transactions"):
+        return
+    columns = {column['name'] for column in inspector.get_columns("transactions")}
+    if "dedup_key" in columns:
+        return
+
+    logger.info("Añadiendo transactions.dedup_key")
+    transactions = Base.metadata.tables["transactions"]
+    update = (
+        transactions.update()
+        .where(transactions.c.id == bindparam("row_id"))
+        .values(dedup_key=bindparam("row_key"))
+    )
+    backfilled = 0
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE transactions ADD COLUMN dedup_key BIGINT"))
+
+        # Recorrido por id en lotes para no cargar la tabla completa
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                select(transactions.c.id, transactions.c.date, transactions.c.concept, transactions.c.amount_cents)
+                .where(transactions.c.id > last_id)
+                .order_by(transactions.c.id)
+                .limit(DEDUP_KEY_BACKFILL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            connection.execute(update, [
+                {"row_id": row.id, "row_key": dedup_key(row.date, row.concept, row.amount_cents)}
+                for row in rows
+            ])
+            backfilled += len(rows)
+            last_id = rows[-1].id
+
+        deleted = connection.execute(text(
+            "DELETE FROM transactions WHERE id NOT IN "
+            "(SELECT MIN(id) FROM transactions GROUP BY dedup_key)"
+        )).rowcount
+        connection.execute(text("DROP INDEX IF EXISTS idx_transaction_unique"))
+        if engine.dialect.name == "postgresql":
+            connection.execute(text("ALTER TABLE transactions ALTER COLUMN dedup_key SET NOT NULL"))
+    logger.info(f"dedup_key rellenada en {backfilled} transacciones ({deleted} duplicados eliminados)")
+
+
+def migrate_sqlite_autoincrement(engine: Engine) -> None:
+    """
+    Reconstruye en SQLite la tabla transactions con AUTOINCREMENT en las bases
+    de datos creadas con versiones anteriores.
+
+    Sin AUTOINCREMENT, SQLite reutiliza los IDs más altos tras un borrado y
+    el índice en memoria de la búsqueda por concepto, que se pone al día por
+    id creciente, dejaría de ver las filas nuevas. SQLite no permite cambiarlo
+    con ALTER TABLE: se crea la tabla nueva, se copian las filas con sus IDs
+    y se elimina la antigua.
+
+    Args:
+        engine: Engine de SQLAlchemy
+    """
+    if engine.dialect.name != "sqlite" or not inspect(engine).has_table("transactions"):
+        return
+    with engine.connect() as connection:
+        table_sql = connection.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"
+        )).scalar()
+    if "AUTOINCREMENT" in table_sql.upper():
+        return
+
+    logger.info("Reconstruyendo transactions con AUTOINCREMENT (SQLite)")
+    transactions = Base.metadata.tables["transactions"]
+    columns = ', '.join(column.name for column in transactions.columns)
+    with engine.begin() as connection:
+        index_names = connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions' AND sql IS NOT NULL"
+        )).scalars().all()
+        for index_name in index_names:
+            connection.execute(text(f'DROP INDEX "{index_name}"'))
+        connection.execute(text("ALTER TABLE transactions RENAME TO transactions_old"))
+        transactions.create(bind=connection)
+        connection.execute(text(f"INSERT INTO transactions ({columns}) SELECT {columns} FROM transactions_old"))
+        connection.execute(text("DROP TABLE transactions_old"))
+    logger.info("Tabla transactions reconstruida con AUTOINCREMENT")
+
+
+def create_concept_search_index(engine: Engine) -> None:
+    """
+    Crea en PostgreSQL el índice GIN de trigramas sobre transactions.concept
+    que resuelve la búsqueda q= (ILIKE '%texto%') sin recorrer la tabla.
+
+    Requiere la extensión pg_trgm; si no se puede instalar (permisos), la
+    búsqueda sigue funcionando sin índice. En otros dialectos la búsqueda usa
+    el índice invertido en memoria de app.services.concept_search.
+
+    Args:
+        engine: Engine de SQLAlchemy
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_transaction_concept_trgm "
+                "ON transactions USING gin (concept gin_trgm_ops)"
+            ))
+    except Exception as e:
+        logger.warning(f"No se pudo crear el índice de trigramas de conceptos: {e}")
+
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Aplica los cambios de esquema pendientes de forma idempotente.
+
+    Args:
+        engine: Engine de SQLAlchemy
+    """
+    migrate_amounts_to_cents(engine)
+    migrate_dedup_key(engine)
+    migrate_sqlite_autoincrement(engine)
+    create_missing_indexes(engine)
+    create_concept_search_index(engine)
+    logger.info("Migraciones de esquema aplicadas")
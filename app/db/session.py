@@ -1,15 +1,49 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 from app.core.logger import setup_logger
+from app.core.metrics import metrics
 import time
 
 logger = setup_logger(__name__)
 
-engine = create_engine(settings.DATABASE_URL)
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    # lower() de SQLite solo convierte ASCII: la búsqueda por concepto usa
+    # py_lower, con las mismas reglas que str.lower() de Python
+    dbapi_connection.create_function(
+        'py_lower', 1, lambda text: text.lower() if text is not None else None, deterministic=True
+    )
+
+
+engine = create_engine(settings.DATABASE_URL, **settings.DB_POOL_OPTIONS)
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _register_sqlite_functions)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Motor asíncrono opcional (asyncpg) para los endpoints de lectura
+async_engine = None
+AsyncSessionLocal = None
+if settings.ASYNC_DB_ENABLED:
+    async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **settings.DB_POOL_OPTIONS)
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", _register_sqlite_functions)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def _pool_samples() -> list:
+    """Estado del pool del motor síncrono para /metrics."""
+    pool = engine.pool
+    samples = []
+    for state in ('size', 'checkedin', 'checkedout', 'overflow'):
+        reader = getattr(pool, state, None)
+        if reader is not None:
+            samples.append(({'state': state}, reader()))
+    return samples
+
+
+metrics.gauge_callback('db_pool_connections', "Conexiones del pool de base de datos por estado", _pool_samples)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -17,6 +51,10 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def check_db_connection(max_retries: int = 3, retry_delay: int = 2) -> bool:
     """
     Verifica la conexión a la base de datos con reintentos.
@@ -1,11 +1,26 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routers import transactions
-from app.db.session import check_db_connection, engine, Base
-from app.models import transaction # Importar para que SQLAlchemy reconozca el modelo
+from app.api.routers import transactions, transactions_async, imports, metrics, rules
+from app.core.config import settings
+from app.core.logger import configure_logging, stop_logging
+from app.core.metrics import http_request_duration
+from app.db.session import check_db_connection, engine, Base, SessionLocal
+from app.db.migrations import run_migrations
+from app.services.classification_rules import load_rules, seed_default_rules
+from app.services.import_jobs import recover_interrupted_jobs
+from app.services.rollup import ensure_rollup
+from app.models import transaction, transaction_rollup, import_job, import_fingerprint, classification_rule # Importar para que SQLAlchemy reconozca los modelos
 
-# Crear tablas
+configure_logging(
+    json_format=settings.LOG_JSON,
+    row_sample_first=settings.LOG_ROW_SAMPLE_FIRST,
+    row_sample_every=settings.LOG_ROW_SAMPLE_EVERY
+)
+
+# Crear tablas y aplicar cambios de esquema pendientes
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(title="Analizador Financiero")
 
@@ -18,11 +33,53 @@ app.add_middleware(
     allow_headers=["*"],  # Permitir todos los headers
 )
 
+# Lecturas con sesión síncrona o asíncrona según la configuración
+read_router = transactions_async.read_router if settings.ASYNC_DB_ENABLED else transactions.read_router
+app.include_router(read_router, prefix="/api/v1", tags=["transactions"])
 app.include_router(transactions.router, prefix="/api/v1", tags=["transactions"])
+app.include_router(imports.router, prefix="/api/v1", tags=["imports"])
+app.include_router(rules.router, prefix="/api/v1", tags=["rules"])
+app.include_router(metrics.router, tags=["metrics"])
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # Latencia por plantilla de ruta (p. ej. /api/v1/transactions/{transaction_id})
+    # para acotar el número de series
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        http_request_duration.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=str(status)
+        )
 
 @app.on_event("startup")
 def startup_event():
-    check_db_connection()
+    if check_db_connection():
+        # Poblar el agregado de estadísticas en bases de datos ya existentes
+        db = SessionLocal()
+        try:
+            ensure_rollup(db)
+            # Reglas del clasificador: sembrar la tabla la primera vez y compilarlas
+            seed_default_rules(db)
+            load_rules(db)
+        finally:
+            db.close()
+        # Imports que un reinicio dejó pendientes o en curso
+        if settings.IMPORT_RECOVER_ON_STARTUP:
+            recover_interrupted_jobs()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Escribir los logs pendientes antes de salir
+    stop_logging()
 
 @app.get("/")
 def read_root():
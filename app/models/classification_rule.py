@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class ClassificationRule(Base):
+    """Keyword del clasificador: si el concepto la contiene, se asigna su categoría."""
+    __tablename__ = "classification_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    category = Column(String, nullable=False)
+    keyword = Column(String, nullable=False)  # En minúsculas
+    priority = Column(Integer, nullable=False)  # Orden de la categoría: gana la menor
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index('idx_classification_rule_unique', 'category', 'keyword', unique=True),
+    )
+
+
+class ClassificationRuleVersion(Base):
+    """Versión de la tabla de reglas (fila única id=1); cada cambio la incrementa."""
+    __tablename__ = "classification_rule_versions"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
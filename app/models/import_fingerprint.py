@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class ImportFingerprint(Base):
+    """Huella SHA-256 de un archivo ya importado y sus estadísticas."""
+    __tablename__ = "import_fingerprints"
+
+    sha256 = Column(String(64), primary_key=True)
+    filename = Column(String, nullable=True)
+    format_detected = Column(String, nullable=True)
+    total_rows = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ImportFingerprintBlock(Base):
+    """Hash de un tramo de filas de datos de un archivo ya importado."""
+    __tablename__ = "import_fingerprint_blocks"
+
+    fingerprint_sha256 = Column(String(64), primary_key=True)
+    block_hash = Column(String(64), primary_key=True)
+    row_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Búsqueda de tramos conocidos en cualquier archivo
+        Index('idx_fingerprint_block_hash', 'block_hash'),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class ImportJob(Base):
+    """Trabajo de importación de un CSV ejecutado en segundo plano."""
+    __tablename__ = "import_jobs"
+
+    id = Column(String(36), primary_key=True)  # UUID
+    filename = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="pending")  # 'pending', 'running', 'completed', 'failed'
+    rows_parsed = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    duplicates = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    format_detected = Column(String, nullable=True)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Index
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -8,14 +8,25 @@ class Transaction(Base):
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False, index=True)
     concept = Column(String, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount_cents = Column(BigInteger, nullable=False)  # Monto exacto en céntimos
+    dedup_key = Column(BigInteger, nullable=False)  # Hash de 64 bits de fecha, concepto y céntimos
     category = Column(String, nullable=True, index=True)
     source = Column(String, nullable=True, default="manual")  # 'manual', 'csv_bank', 'csv_simple'
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Índice compuesto para detectar duplicados
+    # Índice único de duplicados (sobre el hash de la clave, de ancho fijo) e
+    # índice para la paginación por cursor. En SQLite, AUTOINCREMENT impide
+    # reutilizar IDs borrados: el índice de búsqueda por concepto se pone al
+    # día por id creciente (app.services.concept_search)
     __table_args__ = (
-        Index('idx_transaction_unique', 'date', 'concept', 'amount'),
+        Index('idx_transaction_dedup_key', 'dedup_key', unique=True),
+        Index('idx_transaction_date_id', 'date', 'id'),
+        {'sqlite_autoincrement': True},
     )
 
+    @property
+    def amount(self) -> float:
+        """Monto en unidades, para las respuestas de la API."""
+        return self.amount_cents / 100
+
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, BigInteger, String, SmallInteger
+from app.db.session import Base
+
+class TransactionRollup(Base):
+    """
+    Agregado precalculado de transacciones por (mes, categoría, signo).
+    Se mantiene de forma incremental en cada alta y baja de transacciones.
+    """
+    __tablename__ = "transaction_rollups"
+
+    month = Column(String(7), primary_key=True)  # Formato: YYYY-MM
+    category = Column(String, primary_key=True)  # '' para transacciones sin categoría
+    sign = Column(SmallInteger, primary_key=True)  # 1 ingreso, -1 gasto, 0 importe cero
+    count = Column(Integer, nullable=False, default=0)
+    total_cents = Column(BigInteger, nullable=False, default=0)
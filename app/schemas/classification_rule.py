@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+class ClassificationRuleCreate(BaseModel):
+    """Nueva keyword del clasificador"""
+    category: str = Field(..., min_length=1, max_length=100)
+    keyword: str = Field(..., min_length=1, max_length=100)
+    priority: Optional[int] = None  # Por defecto, la de la categoría (o la última si es nueva)
+
+class ClassificationRuleUpdate(BaseModel):
+    """Cambios de una keyword del clasificador (solo los campos enviados)"""
+    category: Optional[str] = Field(None, min_length=1, max_length=100)
+    keyword: Optional[str] = Field(None, min_length=1, max_length=100)
+    priority: Optional[int] = None
+
+class ClassificationRuleResponse(BaseModel):
+    """Keyword del clasificador con su categoría y prioridad"""
+    id: int
+    category: str
+    keyword: str
+    priority: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ClassificationRuleListResponse(BaseModel):
+    """Reglas del clasificador y versión de la tabla"""
+    version: int
+    rules: List[ClassificationRuleResponse]
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class ImportJobResponse(BaseModel):
+    """Estado y progreso de un trabajo de importación"""
+    id: str
+    filename: Optional[str] = None
+    status: str  # 'pending', 'running', 'completed', 'failed'
+    rows_parsed: int
+    inserted: int
+    duplicates: int
+    errors: int
+    format_detected: Optional[str] = None
+    error_message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -23,6 +23,7 @@ class TransactionResponse(BaseModel):
     date: date
     concept: str
     amount: float
+    amount_cents: int  # Monto exacto en céntimos
     category: Optional[str] = None
     source: Optional[str] = None
     created_at: datetime
@@ -32,11 +33,13 @@ class TransactionResponse(BaseModel):
         from_attributes = True
 
 class TransactionListResponse(BaseModel):
-    """Respuesta paginada de transacciones"""
+    """Respuesta paginada de transacciones (por offset o por cursor)"""
     transactions: List[TransactionResponse]
-    total: int
+    total: Optional[int] = None  # None si se pidió include_total=false
     skip: int
     limit: int
+    next_cursor: Optional[str] = None  # Cursor de la página siguiente, None si no hay más
+    cursor: Optional[str] = None  # Cursor usado para esta página
 
 class CategoryStats(BaseModel):
     """Estadísticas por categoría"""
@@ -0,0 +1,155 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Caracteres en blanco que se eliminan de los montos
+WHITESPACE = ' \t\r\n\xa0'
+# Máximo de dígitos enteros: el monto en céntimos debe caber en int64
+MAX_INTEGER_DIGITS = 15
+# Longitud máxima de un monto sin limpiar (signo, separadores, moneda, espacios)
+MAX_RAW_LENGTH = 40
+
+
+class AmountDecoder:
+    """
+    Decodificador vectorizado de montos a céntimos exactos.
+
+    Trabaja con numpy sobre la matriz de códigos de carácter de la columna:
+    los símbolos de moneda (incluido el byte \\x80 del euro leído en latin-1),
+    los espacios y el separador de miles se ignoran con una tabla de códigos
+    precompilada, y los céntimos se acumulan como enteros a partir de los
+    dígitos, sin pasar por float. Cada valor distinto se decodifica una sola vez.
+
+    Ejemplos con el formato europeo: '-24,95€' -> -2495, '1.234,56' -> 123456,
+    '-2,20\\x80' -> -220.
+    """
+
+    def __init__(
+        self,
+        decimal_separator: str = ',',
+        thousands_separator: Optional[str] = '.',
+        currency_symbols: str = '€$\x80'
+    ):
+        """
+        Args:
+            decimal_separator: Separador decimal del formato
+            thousands_separator: Separador de miles del formato, o None
+            currency_symbols: Símbolos de moneda que se ignoran
+        """
+        ignored = currency_symbols + WHITESPACE + (thousands_separator or '')
+        self._ignored_codes = np.array(sorted({ord(char) for char in ignored} | {0}), dtype=np.int64)
+        self._decimal_code = ord(decimal_separator)
+
+    def decode(self, raw_amounts: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decodifica una columna de montos.
+
+        Args:
+            raw_amounts: Columna de montos tal como la lee pandas
+
+        Returns:
+            Tupla (céntimos como int64, máscara de filas inválidas). Son
+            inválidos los nulos, los valores no numéricos y los que tienen más
+            de dos decimales; sus céntimos valen 0.
+        """
+        if pd.api.types.is_numeric_dtype(raw_amounts):
+            return self._decode_numeric(raw_amounts)
+
+        positions, uniques = pd.factorize(raw_amounts)
+        values = np.asarray(uniques).astype(str)
+
+        # Matriz de códigos de carácter de ancho fijo (relleno con 0); los
+        # valores más largos que el máximo admitido se descartan
+        too_long = np.char.str_len(values) > MAX_RAW_LENGTH
+        if too_long.any():
+            values = np.where(too_long, '', values)
+        width = max(1, min(values.dtype.itemsize // 4, MAX_RAW_LENGTH))
+        codes = values.astype(f'U{width}').view(np.uint32).reshape(-1, width).astype(np.int64)
+
+        is_ignored = np.isin(codes, self._ignored_codes)
+        is_digit = (codes >= ord('0')) & (codes <= ord('9'))
+        is_point = codes == self._decimal_code
+        # El signo solo se admite como primer carácter significativo
+        is_first = np.cumsum(~is_ignored, axis=1) == 1
+        is_minus = (codes == ord('-')) & is_first
+        is_sign = is_minus | ((codes == ord('+')) & is_first)
+
+        # Dígitos antes y después del separador decimal
+        after_point = np.cumsum(is_point, axis=1) > 0
+        decimals = (is_digit & after_point).sum(axis=1)
+        integer_digits = (is_digit & ~after_point).sum(axis=1)
+
+        valid = (
+            ~too_long
+            & (is_digit | is_point | is_sign | is_ignored).all(axis=1)
+            & (is_point.sum(axis=1) <= 1)
+            & (decimals <= 2)
+            & (integer_digits <= MAX_INTEGER_DIGITS)
+            & is_digit.any(axis=1)
+        )
+
+        # Entero formado por todos los dígitos, escalado según los decimales
+        units = np.zeros(len(codes), dtype=np.int64)
+        for column in range(width):
+            units = np.where(is_digit[:, column], units * 10 + codes[:, column] - ord('0'), units)
+        cents = units * 10 ** np.clip(2 - decimals, 0, 2)
+        cents = np.where(is_minus.any(axis=1), -cents, cents)
+        cents = np.where(valid, cents, 0)
+
+        # La última posición cubre los nulos (-1 en factorize)
+        cents = np.append(cents, 0)[positions]
+        invalid = ~np.append(valid, False)[positions]
+        return cents, invalid
+
+    def _decode_numeric(self, raw_amounts: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decodifica una columna que pandas ya leyó como numérica (p. ej. '50.00'
+        en el formato simple): los separadores del formato no aplican.
+
+        Args:
+            raw_amounts: Columna numérica de montos
+
+        Returns:
+            Tupla (céntimos como int64, máscara de filas inválidas). Son
+            inválidos los nulos y los valores con más de dos decimales.
+        """
+        scaled = raw_amounts.to_numpy(dtype=np.float64) * 100
+        rounded = np.rint(scaled)
+        with np.errstate(invalid='ignore'):
+            valid = np.isfinite(scaled) & (np.abs(scaled - rounded) < 1e-6) & (np.abs(rounded) < 10 ** (MAX_INTEGER_DIGITS + 2))
+        cents = np.where(valid, rounded, 0).astype(np.int64)
+        return cents, ~valid
+
+
+def cents_to_amount(cents: np.ndarray) -> np.ndarray:
+    """
+    Convierte céntimos a montos float. La división de enteros exactos da el
+    float más cercano al decimal, igual que float('24.95').
+
+    Args:
+        cents: Céntimos como int64
+
+    Returns:
+        Montos como float64
+    """
+    return cents / 100
+
+
+def amount_to_cents(amount: float, rounding: str = ROUND_HALF_UP) -> int:
+    """
+    Convierte un monto a céntimos a partir de su representación decimal, sin
+    los errores de multiplicar el float (0.29 * 100 = 28.999...).
+
+    Args:
+        amount: Monto en unidades
+        rounding: Modo de redondeo de decimal para los montos con más de dos
+            decimales (ROUND_CEILING/ROUND_FLOOR para límites de filtros)
+
+    Returns:
+        Céntimos como entero
+    """
+    return int((Decimal(repr(float(amount))) * 100).quantize(Decimal(1), rounding=rounding))
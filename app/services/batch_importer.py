@@ -0,0 +1,244 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.services.classification_rules import refresh_rules
+from app.services.csv_parser import TransactionCSVParser, CSVParseError
+from app.services.fingerprints import content_blocks, find_fingerprint, register_fingerprint, cached_statistics
+from app.services.importer import ImportStorageError, detected_source, process_batch, record_import_rows
+from app.services.response_cache import response_cache
+from app.core.config import settings
+from app.core.logger import init_worker_logging, row_log_scope, setup_logger, worker_log_queue
+from app.core.metrics import stage_timer
+
+logger = setup_logger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """
+    Pool de procesos para parsear archivos en paralelo, creado bajo demanda.
+
+    Los procesos se arrancan con spawn y no con fork: el servidor ya tiene
+    hilos en marcha (imports, escritor de logs, pool de conexiones) y un
+    proceso hijo podría heredar un lock tomado y bloquearse. Los procesos
+    envían sus logs a este proceso, que es el único que escribe el archivo.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = settings.BATCH_PARSE_WORKERS or os.cpu_count() or 1
+            context = multiprocessing.get_context("spawn")
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=init_worker_logging,
+                initargs=(worker_log_queue(context), settings.LOG_ROW_SAMPLE_FIRST, settings.LOG_ROW_SAMPLE_EVERY)
+            )
+            logger.info(f"Pool de parsing por lotes iniciado con {workers} procesos")
+    return _executor
+
+
+def expand_files(files: List[Tuple[str, bytes]]) -> List[Tuple[str, bytes]]:
+    """
+    Expande los archivos ZIP en los CSV que contienen.
+
+    Args:
+        files: Lista de (nombre, contenido) tal como se subieron
+
+    Returns:
+        Lista de (nombre, contenido) solo con CSV
+
+    Raises:
+        CSVParseError: Si un archivo no es CSV ni ZIP, el ZIP no es válido o
+            su contenido descomprimido supera los límites configurados
+    """
+    expanded = []
+    uncompressed = 0
+    for name, content in files:
+        if name.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                    for member in archive.infolist():
+                        if member.is_dir() or not member.filename.lower().endswith('.csv'):
+                            continue
+                        # Se comprueba el tamaño declarado antes de descomprimir;
+                        # zipfile nunca lee más bytes de los declarados
+                        if member.file_size > settings.BATCH_ZIP_MEMBER_MAX_BYTES:
+                            raise CSVParseError(
+                                f"El archivo {name}/{member.filename} supera el tamaño máximo descomprimido "
+                                f"({settings.BATCH_ZIP_MEMBER_MAX_BYTES} bytes)"
+                            )
+                        uncompressed += member.file_size
+                        if uncompressed > settings.BATCH_ZIP_TOTAL_MAX_BYTES:
+                            raise CSVParseError(
+                                f"El contenido descomprimido de los ZIP supera el máximo "
+                                f"({settings.BATCH_ZIP_TOTAL_MAX_BYTES} bytes)"
+                            )
+                        expanded.append((f"{name}/{member.filename}", archive.read(member)))
+            except zipfile.BadZipFile:
+                raise CSVParseError(f"El archivo {name} no es un ZIP válido")
+        elif name.lower().endswith('.csv'):
+            expanded.append((name, content))
+        else:
+            raise CSVParseError(f"El archivo {name} debe ser un CSV o un ZIP con CSV")
+    return expanded
+
+
+def parse_file(name: str, content: bytes) -> Dict:
+    """
+    Parsea un archivo completo. Se ejecuta en un proceso del pool, por lo que
+    recibe y devuelve solo datos serializables.
+
+    Args:
+        name: Nombre del archivo
+        content: Contenido del archivo en bytes
+
+    Returns:
+        Diccionario con filename, source, header_lines, transactions y error
+    """
+    parser = TransactionCSVParser()
+    try:
+        with row_log_scope(name):
+            transactions = parser.parse(content)
+    except CSVParseError as e:
+        return {'filename': name, 'source': None, 'header_lines': 0, 'transactions': [], 'error': str(e)}
+    return {
+        'filename': name,
+        'source': detected_source(parser),
+        'header_lines': parser.detected_format['skiprows'] + 1,
+        'transactions': transactions,
+        'error': None
+    }
+
+
+def import_batch(db: Session, files: List[Tuple[str, bytes]]) -> Dict:
+    """
+    Importa varios archivos: los parsea en paralelo en el pool de procesos y
+    guarda el resultado combinado en una única transacción.
+
+    Los archivos se procesan en el orden recibido; una transacción repetida en
+    varios archivos se guarda una vez y cuenta como duplicada en los demás.
+    Los archivos con una huella ya registrada no se parsean.
+
+    Args:
+        db: Sesión de base de datos
+        files: Lista de (nombre, contenido) de CSV o ZIP
+
+    Returns:
+        Respuesta con estadísticas por archivo y totales
+
+    Raises:
+        CSVParseError: Si algún archivo no es válido o ninguno se pudo parsear
+        ImportStorageError: Si falla el guardado en base de datos
+    """
+    files = expand_files(files)
+    if not files:
+        raise CSVParseError("No se recibió ningún archivo CSV")
+
+    # Los archivos idénticos a uno ya importado no se parsean
+    digests = [hashlib.sha256(content).hexdigest() for _, content in files]
+    fingerprints = {}
+    if settings.IMPORT_FINGERPRINTS_ENABLED:
+        with stage_timer('fingerprint'):
+            for digest in set(digests):
+                fingerprint = find_fingerprint(db, digest)
+                if fingerprint is not None:
+                    fingerprints[digest] = fingerprint
+    pending = [index for index, digest in enumerate(digests) if digest not in fingerprints]
+
+    # La detección de formato ocurre dentro de parse_file, en los procesos; la
+    # etapa mide el lote completo, no un bloque como 'parse' en /upload
+    with stage_timer('batch_parse'):
+        parsed_files = dict(zip(pending, _get_executor().map(
+            parse_file,
+            [files[index][0] for index in pending],
+            [files[index][1] for index in pending]
+        )))
+    logger.info(f"Lote parseado: {len(parsed_files)} archivos, {len(files) - len(pending)} ya importados")
+
+    if parsed_files and all(parsed['error'] for parsed in parsed_files.values()):
+        raise CSVParseError(
+            "No se pudo parsear ningún archivo. Errores: "
+            + '; '.join(f"{parsed['filename']}: {parsed['error']}" for parsed in list(parsed_files.values())[:5])
+        )
+
+    refresh_rules(db)
+    results = []
+    totals = {'total': 0, 'processed': 0, 'duplicates': 0, 'errors': 0}
+    try:
+        for index, (name, content) in enumerate(files):
+            if index not in parsed_files:
+                fingerprint = fingerprints[digests[index]]
+                statistics = cached_statistics(fingerprint)
+                totals['total'] += statistics['total_rows']
+                totals['duplicates'] += statistics['duplicates_skipped']
+                totals['errors'] += statistics['errors']
+                results.append({
+                    "filename": name,
+                    "format_detected": fingerprint.format_detected,
+                    "error": None,
+                    "statistics": statistics
+                })
+                continue
+
+            parsed = parsed_files[index]
+            stats = {'total': len(parsed['transactions']), 'processed': 0, 'duplicates': 0, 'errors': 0}
+            transactions = parsed['transactions']
+            for start in range(0, len(transactions), settings.UPLOAD_CHUNK_SIZE):
+                process_batch(db, transactions[start:start + settings.UPLOAD_CHUNK_SIZE], parsed['source'], stats)
+
+            for key in totals:
+                totals[key] += stats[key]
+            statistics = {
+                "total_rows": stats['total'],
+                "new_transactions": stats['processed'],
+                "duplicates_skipped": stats['duplicates'],
+                "errors": stats['errors']
+            }
+            results.append({
+                "filename": parsed['filename'],
+                "format_detected": parsed['source'],
+                "error": parsed['error'],
+                "statistics": statistics
+            })
+            if settings.IMPORT_FINGERPRINTS_ENABLED and not parsed['error'] and not stats['errors']:
+                register_fingerprint(
+                    db, digests[index], name, parsed['source'], statistics,
+                    content_blocks(content, parsed['header_lines'])
+                )
+        with stage_timer('persist'):
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al guardar el lote en base de datos: {e}")
+        raise ImportStorageError(f"Error al guardar transacciones: {str(e)}")
+
+    record_import_rows({
+        "new_transactions": totals['processed'],
+        "duplicates_skipped": totals['duplicates'],
+        "errors": totals['errors']
+    })
+    if totals['processed']:
+        response_cache.invalidate()
+
+    logger.info(f"Lote importado: {totals['processed']} nuevas, {totals['duplicates']} duplicadas")
+    return {
+        "message": "Procesamiento completado",
+        "files": results,
+        "statistics": {
+            "files": len(results),
+            "failed_files": sum(1 for result in results if result['error']),
+            "total_rows": totals['total'],
+            "new_transactions": totals['processed'],
+            "duplicates_skipped": totals['duplicates'],
+            "errors": totals['errors']
+        }
+    }
@@ -0,0 +1,278 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.classification_rule import ClassificationRule, ClassificationRuleVersion
+from app.services.classifier import CATEGORY_KEYWORDS, KeywordClassifier, current_classifier, set_category_keywords
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Fila única de classification_rule_versions
+VERSION_ROW_ID = 1
+
+_reload_lock = threading.Lock()
+
+
+class RuleNotFoundError(Exception):
+    """Excepción para reglas de clasificación inexistentes"""
+    pass
+
+
+class RuleConflictError(Exception):
+    """Excepción para reglas de clasificación duplicadas (misma categoría y keyword)"""
+    pass
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Keyword en minúsculas y con los espacios normalizados, como los conceptos."""
+    return ' '.join(keyword.lower().split())
+
+
+def get_rules_version(db: Session) -> Optional[int]:
+    """
+    Lee la versión de la tabla de reglas (una búsqueda por clave primaria).
+
+    Args:
+        db: Sesión de base de datos
+
+    Returns:
+        Versión actual, o None si las reglas aún no se han sembrado
+    """
+    return db.query(ClassificationRuleVersion.version).filter(
+        ClassificationRuleVersion.id == VERSION_ROW_ID
+    ).scalar()
+
+
+def seed_default_rules(db: Session) -> None:
+    """
+    Siembra la tabla de reglas con CATEGORY_KEYWORDS la primera vez que
+    arranca la aplicación. Si otro worker la siembra a la vez, el conflicto
+    de clave primaria se ignora.
+
+    Args:
+        db: Sesión de base de datos
+    """
+    if get_rules_version(db) is not None:
+        return
+
+    try:
+        db.add(ClassificationRuleVersion(id=VERSION_ROW_ID, version=1))
+        db.add_all([
+            ClassificationRule(category=category, keyword=normalize_keyword(keyword), priority=priority)
+            for priority, (category, keywords) in enumerate(CATEGORY_KEYWORDS.items())
+            for keyword in dict.fromkeys(keywords)
+        ])
+        db.commit()
+        logger.info(f"Reglas de clasificación sembradas: {len(CATEGORY_KEYWORDS)} categorías")
+    except IntegrityError:
+        db.rollback()
+        logger.info("Reglas de clasificación ya sembradas por otro proceso")
+
+
+def compile_rules(rules: List[ClassificationRule]) -> Dict[str, List[str]]:
+    """
+    Agrupa las reglas en la tabla categoría -> keywords del clasificador.
+
+    Las categorías se ordenan por su menor prioridad (a igualdad, por la regla
+    más antigua); las keywords, por antigüedad.
+
+    Args:
+        rules: Reglas de clasificación
+
+    Returns:
+        Categorías con sus keywords, en orden de prioridad
+    """
+    ordered = sorted(rules, key=lambda rule: (rule.priority, rule.id))
+    category_keywords: Dict[str, List[str]] = {}
+    for rule in ordered:
+        category_keywords.setdefault(rule.category, []).append(rule.keyword)
+    return category_keywords
+
+
+def load_rules(db: Session) -> KeywordClassifier:
+    """
+    Compila las reglas guardadas y las publica como clasificador por defecto.
+
+    La versión se lee antes que las reglas: si cambian entre ambas lecturas,
+    la siguiente comprobación detecta una versión mayor y vuelve a cargar.
+
+    Args:
+        db: Sesión de base de datos
+
+    Returns:
+        El nuevo clasificador por defecto
+    """
+    version = get_rules_version(db) or 0
+    rules = db.query(ClassificationRule).all()
+    return set_category_keywords(compile_rules(rules), version=version)
+
+
+def refresh_rules(db: Session) -> KeywordClassifier:
+    """
+    Comprueba la versión de las reglas y, si otro worker las ha cambiado,
+    recompila el clasificador. Se llama al empezar cada operación que
+    clasifica; el coste habitual es una lectura por clave primaria.
+
+    Args:
+        db: Sesión de base de datos
+
+    Returns:
+        Clasificador por defecto vigente
+    """
+    version = get_rules_version(db)
+    if version is None or version == current_classifier().version:
+        return current_classifier()
+
+    with _reload_lock:
+        if version != current_classifier().version:
+            logger.info(f"Reglas de clasificación cambiadas (versión {version}): recompilando")
+            load_rules(db)
+    return current_classifier()
+
+
+def list_rules(db: Session) -> Tuple[int, List[ClassificationRule]]:
+    """
+    Lista las reglas en orden de prioridad.
+
+    Args:
+        db: Sesión de base de datos
+
+    Returns:
+        Tupla (versión, reglas)
+    """
+    rules = db.query(ClassificationRule).order_by(
+        ClassificationRule.priority, ClassificationRule.category, ClassificationRule.id
+    ).all()
+    return get_rules_version(db) or 0, rules
+
+
+def _category_priority(db: Session, category: str) -> int:
+    """Prioridad de una categoría existente, o la siguiente a la última si es nueva."""
+    priority = db.query(func.min(ClassificationRule.priority)).filter(
+        ClassificationRule.category == category
+    ).scalar()
+    if priority is not None:
+        return priority
+    last = db.query(func.max(ClassificationRule.priority)).scalar()
+    return 0 if last is None else last + 1
+
+
+def _commit_change(db: Session) -> None:
+    """
+    Incrementa la versión, confirma el cambio y recompila el clasificador de
+    este worker; los demás lo detectan en su siguiente comprobación.
+
+    Raises:
+        RuleConflictError: Si la regla duplica otra existente
+    """
+    db.execute(
+        update(ClassificationRuleVersion)
+        .where(ClassificationRuleVersion.id == VERSION_ROW_ID)
+        .values(version=ClassificationRuleVersion.version + 1)
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise RuleConflictError("Ya existe una regla con esa categoría y keyword")
+    with _reload_lock:
+        load_rules(db)
+
+
+def create_rule(db: Session, category: str, keyword: str, priority: Optional[int] = None) -> ClassificationRule:
+    """
+    Crea una regla de clasificación.
+
+    Args:
+        db: Sesión de base de datos
+        category: Categoría asignada
+        keyword: Texto que debe contener el concepto
+        priority: Prioridad de la categoría (por defecto, la que ya tiene o la
+            siguiente a la última)
+
+    Returns:
+        Regla creada
+
+    Raises:
+        ValueError: Si la categoría o la keyword quedan vacías
+        RuleConflictError: Si ya existe la misma keyword en la categoría
+    """
+    category, keyword = category.strip(), normalize_keyword(keyword)
+    if not category or not keyword:
+        raise ValueError("La categoría y la keyword no pueden estar vacías")
+    rule = ClassificationRule(
+        category=category,
+        keyword=keyword,
+        priority=_category_priority(db, category) if priority is None else priority
+    )
+    db.add(rule)
+    _commit_change(db)
+    db.refresh(rule)
+    logger.info(f"Regla creada: '{rule.keyword}' -> {rule.category}")
+    return rule
+
+
+def update_rule(
+    db: Session,
+    rule_id: int,
+    category: Optional[str] = None,
+    keyword: Optional[str] = None,
+    priority: Optional[int] = None
+) -> ClassificationRule:
+    """
+    Modifica los campos indicados de una regla.
+
+    Args:
+        db: Sesión de base de datos
+        rule_id: ID de la regla
+        category: Nueva categoría
+        keyword: Nueva keyword
+        priority: Nueva prioridad
+
+    Returns:
+        Regla modificada
+
+    Raises:
+        RuleNotFoundError: Si la regla no existe
+        ValueError: Si la categoría o la keyword quedan vacías
+        RuleConflictError: Si el cambio duplica otra regla
+    """
+    rule = db.get(ClassificationRule, rule_id)
+    if rule is None:
+        raise RuleNotFoundError(f"Regla con ID {rule_id} no encontrada")
+
+    if category is not None:
+        rule.category = category.strip()
+    if keyword is not None:
+        rule.keyword = normalize_keyword(keyword)
+    if priority is not None:
+        rule.priority = priority
+    if not rule.category or not rule.keyword:
+        db.rollback()
+        raise ValueError("La categoría y la keyword no pueden estar vacías")
+    _commit_change(db)
+    db.refresh(rule)
+    logger.info(f"Regla {rule_id} modificada: '{rule.keyword}' -> {rule.category}")
+    return rule
+
+
+def delete_rule(db: Session, rule_id: int) -> None:
+    """
+    Elimina una regla.
+
+    Args:
+        db: Sesión de base de datos
+        rule_id: ID de la regla
+
+    Raises:
+        RuleNotFoundError: Si la regla no existe
+    """
+    rule = db.get(ClassificationRule, rule_id)
+    if rule is None:
+        raise RuleNotFoundError(f"Regla con ID {rule_id} no encontrada")
+
+    db.delete(rule)
+    _commit_change(db)
+    logger.info(f"Regla {rule_id} eliminada: '{rule.keyword}' -> {rule.category}")
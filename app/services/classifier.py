@@ -1,7 +1,309 @@
-from app.core.logger import setup_logger
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+from app.core.config import settings
+from app.core.logger import PER_ROW, setup_logger
+from app.core.metrics import metrics
 
 logger = setup_logger(__name__)
 
+# Categorías con sus keywords, en orden de prioridad
+CATEGORY_KEYWORDS = {
+    "Comida y Supermercado": [
+        "restaurante", "bar", "comida", "supermercado", "burger", "pizza",
+        "mercadona", "carrefour", "lidl", "aldi", "dia", "eroski",
+        "cafeteria", "cafe", "panaderia", "fruteria", "charcuteria"
+    ],
+    "Transporte": [
+        "uber", "taxi", "cabify", "metro", "bus", "autobus", "tren", "renfe",
+        "parking", "aparcamiento", "peaje", "toll", "bicing", "patinete"
+    ],
+    "Gasolina": [
+        "gasolinera", "repsol", "cepsa", "bp", "shell", "galp", "combustible",
+        "gasolina", "diesel", "carburante"
+    ],
+    "Ocio y Entretenimiento": [
+        "cine", "teatro", "netflix", "spotify", "hbo", "disney", "amazon prime",
+        "juego", "steam", "playstation", "xbox", "concierto", "museo", "gym",
+        "gimnasio", "deporte"
+    ],
+    "Viajes y Alojamiento": [
+        "vuelo", "hotel", "airbnb", "booking", "hostal", "avion", "aeropuerto",
+        "ryanair", "iberia", "vueling", "easyjet"
+    ],
+    "Compras Online": [
+        "amazon", "ebay", "aliexpress", "zalando", "asos", "shein",
+        "compra internet", "paypal"
+    ],
+    "Salud y Farmacia": [
+        "farmacia", "medico", "hospital", "clinica", "dentista", "optica",
+        "seguro salud", "sanitas", "adeslas"
+    ],
+    "Educación": [
+        "universidad", "colegio", "academia", "curso", "formacion", "libro",
+        "libreria", "material escolar"
+    ],
+    "Servicios y Suscripciones": [
+        "telefono", "movil", "internet", "luz", "agua", "gas", "electricidad",
+        "vodafone", "movistar", "orange", "yoigo", "endesa", "iberdrola",
+        "suscripcion", "cuota"
+    ],
+    "Transferencias y Cajeros": [
+        "transferencia", "cajero", "retirada", "ingreso", "bizum"
+    ]
+}
+
+# Categoría asignada cuando no coincide ninguna keyword
+DEFAULT_CATEGORY = "Otros"
+
+
+class KeywordClassifier:
+    """
+    Clasificador por palabras clave compilado una sola vez.
+
+    Todas las keywords se combinan en una única expresión regular con forma
+    de trie que se evalúa en cada posición del concepto (lookahead), de modo
+    que una sola pasada encuentra todas las coincidencias. Se conserva la regla
+    original: gana la primera categoría en orden de declaración que tenga
+    alguna keyword contenida en el concepto.
+    """
+
+    def __init__(
+        self,
+        category_keywords: Dict[str, List[str]],
+        default_category: str = DEFAULT_CATEGORY,
+        cache_size: int = 10000,
+        version: int = 0
+    ):
+        self.categories = list(category_keywords.keys())
+        self.default_category = default_category
+        # Versión de la tabla de reglas de la que se compiló (0 = tabla del código)
+        self.version = version
+
+        # Caché LRU concepto normalizado -> categoría. Pertenece a esta tabla de
+        # keywords: al cambiar la tabla se crea otro clasificador con caché vacía
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # keyword -> índice de la primera categoría que la declara
+        keyword_rank = {}
+        for rank, keywords in enumerate(category_keywords.values()):
+            for keyword in keywords:
+                keyword_rank.setdefault(keyword.lower(), rank)
+
+        # En cada posición el trie devuelve la keyword más larga; las keywords
+        # que son prefijo de ella también coinciden, así que cada keyword
+        # guarda el mejor rango de toda su cadena de prefijos
+        self._keyword_rank = {
+            keyword: min(rank for prefix, rank in keyword_rank.items() if keyword.startswith(prefix))
+            for keyword in keyword_rank
+        }
+        self._pattern = re.compile("(?=(" + _trie_regex(keyword_rank) + "))") if keyword_rank else None
+
+    def classify(self, concept: str) -> str:
+        """
+        Clasifica un concepto.
+
+        Args:
+            concept: Concepto/descripción de la transacción
+
+        Returns:
+            Categoría asignada
+        """
+        normalized = concept.lower()
+
+        with self._cache_lock:
+            category = self._cache.get(normalized)
+            if category is not None:
+                self._cache.move_to_end(normalized)
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+        if category is None:
+            category = self._match(normalized)
+            if self.cache_size > 0:
+                with self._cache_lock:
+                    self._cache[normalized] = category
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Transacción '%s...' clasificada como '%s'", concept[:50], category, extra=PER_ROW)
+        return category
+
+    def _match(self, normalized: str) -> str:
+        """
+        Evalúa el patrón compilado sobre un concepto ya normalizado.
+
+        Args:
+            normalized: Concepto en minúsculas
+
+        Returns:
+            Categoría asignada
+        """
+        best_rank = None
+        if self._pattern is not None:
+            for match in self._pattern.finditer(normalized):
+                rank = self._keyword_rank[match.group(1)]
+                if best_rank is None or rank < best_rank:
+                    best_rank = rank
+                    if rank == 0:
+                        break
+
+        if best_rank is None:
+            return self.default_category
+        return self.categories[best_rank]
+
+    def cache_info(self) -> Dict:
+        """
+        Devuelve los contadores de la caché para monitorización.
+
+        Returns:
+            Diccionario con hits, misses, hit_rate, size y maxsize
+        """
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'hit_rate': round(self.cache_hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._cache),
+                'maxsize': self.cache_size
+            }
+
+    def classify_many(self, concepts: Iterable[str]) -> List[str]:
+        """
+        Clasifica una secuencia de conceptos, evaluando una sola vez cada
+        concepto distinto.
+
+        Args:
+            concepts: Conceptos a clasificar
+
+        Returns:
+            Categorías en el mismo orden que los conceptos
+        """
+        resolved = {}
+        categories = []
+        for concept in concepts:
+            category = resolved.get(concept)
+            if category is None:
+                category = resolved[concept] = self.classify(concept)
+            categories.append(category)
+        return categories
+
+
+def _trie_regex(keywords: Iterable[str]) -> str:
+    """
+    Construye una expresión regular con forma de trie que reconoce la keyword
+    más larga que empieza en la posición actual.
+
+    Args:
+        keywords: Keywords a reconocer
+
+    Returns:
+        Patrón regex (sin compilar)
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def to_regex(node: Dict) -> str:
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Fin de keyword: el resto es opcional y voraz, se prefiere la más larga
+        if '' in node:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return to_regex(trie)
+
+
+# Clasificador por defecto, compilado al importar el módulo
+default_classifier = KeywordClassifier(CATEGORY_KEYWORDS, cache_size=settings.CLASSIFIER_CACHE_SIZE)
+
+
+def set_category_keywords(category_keywords: Dict[str, List[str]], version: int = 0) -> KeywordClassifier:
+    """
+    Sustituye la tabla de keywords del clasificador por defecto.
+    
+    Se compila un clasificador nuevo (con su caché vacía) y se publica con una
+    única asignación, de modo que la caché anterior queda invalidada y los
+    hilos que están clasificando nunca esperan.
+    
+    Args:
+        category_keywords: Categorías con sus keywords, en orden de prioridad
+        version: Versión de la tabla de reglas de la que proceden
+        
+    Returns:
+        El nuevo clasificador por defecto
+    """
+    global default_classifier
+    default_classifier = KeywordClassifier(
+        category_keywords, cache_size=settings.CLASSIFIER_CACHE_SIZE, version=version
+    )
+    logger.info(f"Tabla de keywords actualizada: {len(category_keywords)} categorías (versión {version})")
+    return default_classifier
+
+
+def current_classifier() -> KeywordClassifier:
+    """
+    Clasificador por defecto vigente. Quien clasifica muchas filas seguidas
+    (p. ej. una reclasificación) lo obtiene una vez para usar la misma tabla
+    de keywords en todo el proceso.
+    
+    Returns:
+        Clasificador por defecto
+    """
+    return default_classifier
+
+
+def classifier_cache_info() -> Dict:
+    """
+    Contadores de la caché del clasificador por defecto.
+    
+    Returns:
+        Diccionario con hits, misses, hit_rate, size y maxsize
+    """
+    return default_classifier.cache_info()
+
+
+def _classifier_cache_samples() -> List:
+    """Muestras de la caché del clasificador para /metrics."""
+    info = classifier_cache_info()
+    return [
+        ({'result': 'hit'}, info['hits']),
+        ({'result': 'miss'}, info['misses'])
+    ]
+
+
+metrics.gauge_callback(
+    'classifier_cache_lookups',
+    "Búsquedas en la caché del clasificador vigente, por resultado (se reinicia al cambiar las keywords)",
+    _classifier_cache_samples
+)
+metrics.gauge_callback(
+    'classifier_cache_hit_ratio',
+    "Proporción de aciertos de la caché del clasificador vigente",
+    lambda: [({}, classifier_cache_info()['hit_rate'])]
+)
+metrics.gauge_callback(
+    'classifier_cache_entries',
+    "Conceptos guardados en la caché del clasificador vigente",
+    lambda: [({}, classifier_cache_info()['size'])]
+)
+
+
 def classify_transaction(concept: str) -> str:
     """
     Clasifica una transacción basándose en palabras clave del concepto.
@@ -12,61 +314,17 @@ def classify_transaction(concept: str) -> str:
     Returns:
         Categoría asignada
     """
-    concept_lower = concept.lower()
-    
-    # Categorías con sus keywords
-    categories = {
-        "Comida y Supermercado": [
-            "restaurante", "bar", "comida", "supermercado", "burger", "pizza",
-            "mercadona", "carrefour", "lidl", "aldi", "dia", "eroski",
-            "cafeteria", "cafe", "panaderia", "fruteria", "charcuteria"
-        ],
-        "Transporte": [
-            "uber", "taxi", "cabify", "metro", "bus", "autobus", "tren", "renfe",
-            "parking", "aparcamiento", "peaje", "toll", "bicing", "patinete"
-        ],
-        "Gasolina": [
-            "gasolinera", "repsol", "cepsa", "bp", "shell", "galp", "combustible",
-            "gasolina", "diesel", "carburante"
-        ],
-        "Ocio y Entretenimiento": [
-            "cine", "teatro", "netflix", "spotify", "hbo", "disney", "amazon prime",
-            "juego", "steam", "playstation", "xbox", "concierto", "museo", "gym",
-            "gimnasio", "deporte"
-        ],
-        "Viajes y Alojamiento": [
-            "vuelo", "hotel", "airbnb", "booking", "hostal", "avion", "aeropuerto",
-            "ryanair", "iberia", "vueling", "easyjet"
-        ],
-        "Compras Online": [
-            "amazon", "ebay", "aliexpress", "zalando", "asos", "shein",
-            "compra internet", "paypal"
-        ],
-        "Salud y Farmacia": [
-            "farmacia", "medico", "hospital", "clinica", "dentista", "optica",
-            "seguro salud", "sanitas", "adeslas"
-        ],
-        "Educación": [
-            "universidad", "colegio", "academia", "curso", "formacion", "libro",
-            "libreria", "material escolar"
-        ],
-        "Servicios y Suscripciones": [
-            "telefono", "movil", "internet", "luz", "agua", "gas", "electricidad",
-            "vodafone", "movistar", "orange", "yoigo", "endesa", "iberdrola",
-            "suscripcion", "cuota"
-        ],
-        "Transferencias y Cajeros": [
-            "transferencia", "cajero", "retirada", "ingreso", "bizum"
-        ]
-    }
-    
-    # Buscar coincidencias
-    for category, keywords in categories.items():
-        if any(keyword in concept_lower for keyword in keywords):
-            logger.debug(f"Transacción '{concept[:50]}...' clasificada como '{category}'")
-            return category
-    
-    # Categoría por defecto
-    logger.debug(f"Transacción '{concept[:50]}...' clasificada como 'Otros' (sin coincidencias)")
-    return "Otros"
+    return default_classifier.classify(concept)
+
 
+def classify_many(concepts: Iterable[str]) -> List[str]:
+    """
+    Clasifica varias transacciones en una sola llamada.
+    
+    Args:
+        concepts: Conceptos/descripciones de las transacciones
+        
+    Returns:
+        Categorías asignadas, en el mismo orden
+    """
+    return default_classifier.classify_many(concepts)
@@ -0,0 +1,163 @@
+import threading
+from typing import Dict, List, Optional, Set
+from sqlalchemy import Boolean, func, literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+from app.models.transaction import Transaction
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Longitud mínima de la búsqueda para usar trigramas
+TRIGRAM_SIZE = 3
+# Por encima de este número de candidatos la búsqueda es poco selectiva y se
+# resuelve solo con LIKE (un IN enorme sería más lento que recorrer la tabla)
+MAX_CANDIDATE_IDS = 5000
+# Filas por consulta al cargar conceptos en el índice
+LOAD_BATCH_SIZE = 10000
+
+
+def escape_like(text: str) -> str:
+    """Escapa los comodines de LIKE (con '\\' como carácter de escape)."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class _ConceptContains(FunctionElement):
+    """Concepto que contiene un patrón en minúsculas, sin distinguir mayúsculas."""
+    type = Boolean()
+    inherit_cache = True
+    name = 'concept_contains'
+
+
+@compiles(_ConceptContains)
+def _compile_concept_contains(element, compiler, **kw):
+    concept, pattern = element.clauses
+    return compiler.process(concept.ilike(pattern, escape='\\'), **kw)
+
+
+@compiles(_ConceptContains, 'sqlite')
+def _compile_concept_contains_sqlite(element, compiler, **kw):
+    # lower() de SQLite solo convierte ASCII ('Ñ', 'É'...): se usa py_lower,
+    # registrada en cada conexión (app.db.session), igual que str.lower()
+    concept, pattern = element.clauses
+    return compiler.process(func.py_lower(concept).like(pattern, escape='\\'), **kw)
+
+
+def concept_search_filter(q: str):
+    """
+    Condición de búsqueda por subcadena en el concepto, sin distinguir
+    mayúsculas (también en letras acentuadas). En PostgreSQL se compila a
+    ILIKE y la resuelve el índice GIN de trigramas idx_transaction_concept_trgm;
+    en SQLite, a py_lower(concept) LIKE, con el mismo criterio que el índice
+    en memoria.
+
+    Args:
+        q: Texto a buscar
+
+    Returns:
+        Condición SQLAlchemy sobre Transaction.concept
+    """
+    return _ConceptContains(Transaction.concept, literal(f"%{escape_like(q.lower())}%"))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigramas distintos de un texto en minúsculas."""
+    return {text[i:i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+
+class ConceptSearchIndex:
+    """
+    Índice invertido en memoria trigrama -> IDs de transacción, para las bases
+    de datos sin pg_trgm (SQLite). Solo preselecciona candidatos: la condición
+    ILIKE se sigue aplicando en la consulta, así que un candidato sobrante
+    (p. ej. una transacción borrada) no cambia el resultado.
+
+    Los conceptos no cambian tras el import, por lo que el índice se pone al
+    día cargando solo las transacciones con id mayor que el último indexado.
+    Esto requiere IDs que nunca se reutilicen (AUTOINCREMENT en SQLite): así
+    un borrado hecho por otro proceso solo deja candidatos sobrantes y nunca
+    oculta filas. Los borrados de este proceso llaman a invalidate() para
+    liberar memoria.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, List[int]] = {}
+        self._max_id = 0
+
+    def invalidate(self) -> None:
+        """Descarta el índice; se reconstruye en la siguiente búsqueda."""
+        with self._lock:
+            self._postings = {}
+            self._max_id = 0
+
+    def _refresh(self, db: Session) -> None:
+        """Indexa las transacciones nuevas desde la última búsqueda."""
+        loaded = 0
+        while True:
+            rows = db.query(Transaction.id, Transaction.concept).filter(
+                Transaction.id > self._max_id
+            ).order_by(Transaction.id).limit(LOAD_BATCH_SIZE).all()
+            if not rows:
+                break
+            for transaction_id, concept in rows:
+                for trigram in trigrams(concept.lower()):
+                    self._postings.setdefault(trigram, []).append(transaction_id)
+            self._max_id = rows[-1][0]
+            loaded += len(rows)
+        if loaded:
+            logger.info(f"Índice de conceptos actualizado: {loaded} transacciones nuevas, {len(self._postings)} trigramas")
+
+    def candidates(self, db: Session, q: str) -> Optional[List[int]]:
+        """
+        IDs de las transacciones cuyo concepto contiene todos los trigramas de
+        la búsqueda.
+
+        Args:
+            db: Sesión de base de datos
+            q: Texto a buscar
+
+        Returns:
+            Lista de IDs candidatos, o None si la búsqueda es demasiado corta
+            o poco selectiva para preseleccionar
+        """
+        query_trigrams = trigrams(q.lower())
+        if not query_trigrams:
+            return None
+
+        with self._lock:
+            self._refresh(db)
+            postings = sorted((self._postings.get(trigram, []) for trigram in query_trigrams), key=len)
+            if len(postings[0]) > MAX_CANDIDATE_IDS:
+                return None
+            matches = set(postings[0])
+            for posting in postings[1:]:
+                matches.intersection_update(posting)
+                if not matches:
+                    break
+        return sorted(matches)
+
+
+concept_search_index = ConceptSearchIndex()
+
+
+def concept_candidate_filters(db: Session, q: Optional[str]) -> List:
+    """
+    Condiciones adicionales para acelerar la búsqueda por concepto en los
+    dialectos sin índice de trigramas: restringe la consulta a los IDs
+    preseleccionados por el índice en memoria.
+
+    Args:
+        db: Sesión de base de datos
+        q: Texto a buscar, o None
+
+    Returns:
+        Lista de condiciones SQLAlchemy (vacía si no aplica)
+    """
+    if not q or db.get_bind().dialect.name == "postgresql":
+        return []
+    candidate_ids = concept_search_index.candidates(db, q)
+    if candidate_ids is None:
+        return []
+    return [Transaction.id.in_(candidate_ids)]
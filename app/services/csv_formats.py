@@ -0,0 +1,233 @@
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.services.amounts import AmountDecoder
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Formatos de exportación soportados. Cada formato declara su firma de
+# cabecera (las columnas de column_mapping), separador, encoding, preámbulo
+# habitual y convenciones de fecha y monto.
+BANK_FORMAT_CONFIG = {
+    'source': 'csv_bank',
+    'label': 'banco',
+    'separator': ';',
+    'encoding': 'latin-1',
+    'skiprows': 7,
+    'date_format': '%d/%m/%Y',
+    'decimal_separator': ',',
+    'thousands_separator': '.',
+    'currency_symbols': '€$\x80',
+    'column_mapping': {
+        'Fecha operación': 'date',
+        'Concepto': 'concept',
+        'Importe': 'amount'
+    }
+}
+
+SIMPLE_FORMAT_CONFIG = {
+    'source': 'csv_simple',
+    'label': 'simple',
+    'separator': ',',
+    'encoding': 'utf-8',
+    'skiprows': 0,
+    'date_format': '%Y-%m-%d',
+    'decimal_separator': '.',
+    'thousands_separator': None,
+    'currency_symbols': '€$\x80',
+    'column_mapping': {
+        'fecha': 'date',
+        'concepto': 'concept',
+        'monto': 'amount'
+    }
+}
+
+# Ancho de cada directiva de fecha admitida por el parser de ancho fijo
+FIXED_WIDTH_DIRECTIVES = {'d': 2, 'm': 2, 'Y': 4}
+
+
+def compile_date_parser(date_format: str) -> Callable[[pd.Series], pd.Series]:
+    """
+    Compila el parser vectorizado de fechas de un formato.
+
+    Los formatos compuestos solo por %d, %m, %Y y separadores literales (p. ej.
+    '%d/%m/%Y') se parsean por posición sobre los códigos de carácter, sin
+    strptime. El resto usa pd.to_datetime con el formato.
+
+    Args:
+        date_format: Formato de fecha (ej: '%d/%m/%Y')
+
+    Returns:
+        Función que recibe una serie de strings y devuelve una serie datetime
+        con NaT en los valores que no se pudieron convertir
+    """
+    fields = {}
+    literals = {}
+    position = 0
+    for token in re.findall(r'%.|[^%]', date_format):
+        if token.startswith('%'):
+            width = FIXED_WIDTH_DIRECTIVES.get(token[1])
+            if width is None or token[1] in fields:
+                return lambda strings: pd.to_datetime(strings, format=date_format, errors='coerce')
+            fields[token[1]] = (position, width)
+            position += width
+        else:
+            literals[position] = ord(token)
+            position += 1
+    if set(fields) != set(FIXED_WIDTH_DIRECTIVES):
+        return lambda strings: pd.to_datetime(strings, format=date_format, errors='coerce')
+
+    total_width = position
+    digit_positions = [p for p in range(total_width) if p not in literals]
+
+    def parse_values(values: np.ndarray) -> np.ndarray:
+        valid = np.fromiter(map(len, values), dtype=np.int64, count=len(values)) == total_width
+        # Códigos de carácter menos '0': los dígitos quedan en 0..9
+        codes = values.astype(f'U{total_width}').view(np.uint32).reshape(-1, total_width).astype(np.int64) - ord('0')
+
+        digits = codes[:, digit_positions]
+        valid &= ((digits >= 0) & (digits <= 9)).all(axis=1)
+        for literal_position, literal_code in literals.items():
+            valid &= codes[:, literal_position] == literal_code - ord('0')
+
+        def number(directive: str) -> np.ndarray:
+            start, width = fields[directive]
+            value = np.zeros(len(codes), dtype=np.int64)
+            for offset in range(width):
+                value = value * 10 + codes[:, start + offset]
+            return value
+
+        year, month, day = number('Y'), number('m'), number('d')
+        # Rango representable en datetime64[ns], como pd.to_datetime
+        valid &= (year >= 1678) & (year <= 2261) & (month >= 1) & (month <= 12) & (day >= 1)
+
+        month_start = (
+            (np.where(valid, year, 1970) - 1970) * 12 + np.where(valid, month, 1) - 1
+        ).astype('datetime64[M]')
+        month_days = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype(np.int64)
+        valid &= day <= month_days
+
+        dates = month_start.astype('datetime64[D]') + np.where(valid, day - 1, 0)
+        return np.where(valid, dates.astype('datetime64[ns]'), np.datetime64('NaT', 'ns'))
+
+    def parse_fixed_width(strings: pd.Series) -> pd.Series:
+        # Cada fecha distinta se convierte una sola vez (los extractos repiten
+        # la misma fecha en muchas filas); el último valor cubre los nulos (-1)
+        positions, uniques = pd.factorize(strings)
+        dates = np.append(parse_values(np.asarray(uniques, dtype=object)), np.datetime64('NaT', 'ns'))
+        return pd.Series(dates[positions], index=strings.index)
+
+    return parse_fixed_width
+
+
+class FormatRegistry:
+    """
+    Registro de formatos de CSV con un índice de firmas de cabecera.
+
+    La detección decodifica la muestra una vez por encoding registrado y
+    divide cada línea una vez por separador registrado; cada celda se busca
+    en el índice, por lo que el coste no crece con el número de formatos.
+    """
+
+    # Líneas iniciales en las que se busca la cabecera
+    HEADER_SCAN_LINES = 50
+
+    def __init__(self):
+        self.formats: List[Dict] = []
+        # (encoding, separador, columna) -> posiciones de los formatos con esa columna
+        self._signature_index: Dict[Tuple[str, str, str], List[int]] = {}
+        # encoding -> separadores de los formatos con ese encoding
+        self._scan_groups: Dict[str, List[str]] = {}
+
+    def register(self, format_config: Dict) -> Dict:
+        """
+        Registra un formato y compila su parser de fechas y su decodificador
+        de montos.
+
+        Args:
+            format_config: Configuración del formato
+
+        Returns:
+            Configuración registrada, con date_parser y amount_decoder
+        """
+        compiled = {
+            **format_config,
+            'date_parser': compile_date_parser(format_config['date_format']),
+            'amount_decoder': AmountDecoder(
+                format_config['decimal_separator'],
+                format_config['thousands_separator'],
+                format_config['currency_symbols']
+            )
+        }
+        position = len(self.formats)
+        self.formats.append(compiled)
+
+        encoding, separator = format_config['encoding'], format_config['separator']
+        separators = self._scan_groups.setdefault(encoding, [])
+        if separator not in separators:
+            separators.append(separator)
+        for column in format_config['column_mapping']:
+            self._signature_index.setdefault((encoding, separator, column), []).append(position)
+
+        logger.debug(f"Formato registrado: {format_config['source']}")
+        return compiled
+
+    def detect(self, sample: bytes) -> Optional[Tuple[Dict, int]]:
+        """
+        Busca la cabecera de algún formato registrado en la muestra.
+
+        Se elige la primera línea que contiene columnas de alguna firma y, en
+        ella, el formato con más columnas presentes (a igualdad, el registrado
+        antes).
+
+        Args:
+            sample: Bytes iniciales del archivo, cortados en un salto de línea
+
+        Returns:
+            Tupla (formato, índice de la línea de cabecera), o None si ningún
+            formato coincide
+        """
+        for encoding, separators in self._scan_groups.items():
+            try:
+                text = sample.decode(encoding)
+            except UnicodeDecodeError as e:
+                logger.debug(f"La muestra no es {encoding}: {e}")
+                continue
+
+            for index, line in enumerate(text.split('\n')[:self.HEADER_SCAN_LINES]):
+                hits = Counter()
+                for separator in separators:
+                    for cell in {cell.strip().strip('"') for cell in line.split(separator)}:
+                        hits.update(self._signature_index.get((encoding, separator, cell), ()))
+                if hits:
+                    position = min(hits, key=lambda p: (-hits[p], p))
+                    return self.formats[position], index
+        return None
+
+    def labels(self) -> str:
+        """Nombres legibles de los formatos registrados, para mensajes de error."""
+        labels = [format_config['label'] for format_config in self.formats]
+        return ' y '.join([', '.join(labels[:-1]), labels[-1]]) if len(labels) > 1 else ''.join(labels)
+
+
+format_registry = FormatRegistry()
+format_registry.register(BANK_FORMAT_CONFIG)
+format_registry.register(SIMPLE_FORMAT_CONFIG)
+
+
+def register_format(format_config: Dict) -> Dict:
+    """
+    Registra un nuevo formato de exportación bancaria en el registro global.
+
+    Args:
+        format_config: Configuración con source, label, separator, encoding,
+            skiprows, date_format, decimal_separator, thousands_separator,
+            currency_symbols y column_mapping
+
+    Returns:
+        Configuración registrada, con sus parsers compilados
+    """
+    return format_registry.register(format_config)
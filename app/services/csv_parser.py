@@ -1,9 +1,13 @@
+import numpy as np
 import pandas as pd
 import io
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
-from app.core.logger import setup_logger
+from app.services.amounts import amount_to_cents
+from app.services.csv_formats import BANK_FORMAT_CONFIG, SIMPLE_FORMAT_CONFIG, format_registry
+from app.services.dedup import dedup_key
+from app.core.logger import PER_ROW, setup_logger
 
 logger = setup_logger(__name__)
 
@@ -17,82 +21,55 @@ class TransactionCSVParser:
     Soporta múltiples formatos:
     - Formato banco: separador ';', encoding 'latin-1', formato europeo de montos
     - Formato simple: separador ',', encoding 'utf-8', formato estándar
+    - Cualquier otro formato añadido al registro de csv_formats
     """
     
-    # Configuraciones de formatos soportados
-    BANK_FORMAT_CONFIG = {
-        'separator': ';',
-        'encoding': 'latin-1',
-        'skiprows': 7,
-        'date_format': '%d/%m/%Y',
-        'column_mapping': {
-            'Fecha operación': 'date',
-            'Concepto': 'concept',
-            'Importe': 'amount'
-        }
-    }
+    # Formatos incluidos por defecto; el resto se añaden con
+    # csv_formats.register_format
+    BANK_FORMAT_CONFIG = BANK_FORMAT_CONFIG
+    SIMPLE_FORMAT_CONFIG = SIMPLE_FORMAT_CONFIG
     
-    SIMPLE_FORMAT_CONFIG = {
-        'separator': ',',
-        'encoding': 'utf-8',
-        'skiprows': 0,
-        'date_format': '%Y-%m-%d',
-        'column_mapping': {
-            'fecha': 'date',
-            'concepto': 'concept',
-            'monto': 'amount'
-        }
-    }
+    # Bytes iniciales usados para detectar el formato
+    DETECTION_SAMPLE_SIZE = 8 * 1024
     
     def __init__(self):
         self.detected_format = None
+        self.error_count = 0
+        self.errors = []
     
     def detect_format(self, content: bytes) -> Dict:
         """
-        Detecta automáticamente el formato del CSV.
+        Detecta automáticamente el formato del CSV a partir de sus primeros KB.
+        
+        La cabecera se busca con el índice de firmas del registro de formatos,
+        de modo que el preámbulo (p. ej. las 7 líneas del formato banco) se
+        localiza sin fijarlo de antemano y el coste no depende del número de
+        formatos. El archivo completo se lee una sola vez después, con la
+        configuración devuelta.
         
         Args:
-            content: Contenido del archivo en bytes
+            content: Contenido del archivo en bytes (basta con el inicio)
             
         Returns:
-            Configuración del formato detectado
+            Configuración del formato detectado, con skiprows resuelto y sus
+            parsers compilados
         """
-        # Intentar con formato banco primero
-        try:
-            df_test = pd.read_csv(
-                io.BytesIO(content),
-                sep=self.BANK_FORMAT_CONFIG['separator'],
-                encoding=self.BANK_FORMAT_CONFIG['encoding'],
-                skiprows=self.BANK_FORMAT_CONFIG['skiprows'],
-                nrows=5
-            )
-            
-            # Verificar si tiene las columnas del formato banco
-            bank_columns = list(self.BANK_FORMAT_CONFIG['column_mapping'].keys())
-            if any(col in df_test.columns for col in bank_columns):
-                logger.info("Formato detectado: Banco (separador ';', encoding 'latin-1')")
-                return self.BANK_FORMAT_CONFIG
-        except Exception as e:
-            logger.debug(f"No es formato banco: {e}")
+        sample = content[:self.DETECTION_SAMPLE_SIZE]
+        if len(content) > self.DETECTION_SAMPLE_SIZE and b'\n' in sample:
+            sample = sample[:sample.rindex(b'\n') + 1]
         
-        # Intentar con formato simple
-        try:
-            df_test = pd.read_csv(
-                io.BytesIO(content),
-                sep=self.SIMPLE_FORMAT_CONFIG['separator'],
-                encoding=self.SIMPLE_FORMAT_CONFIG['encoding'],
-                nrows=5
+        detected = format_registry.detect(sample)
+        if detected is None:
+            raise CSVParseError(
+                f"No se pudo detectar el formato del CSV. Formatos soportados: {format_registry.labels()}"
             )
-            
-            # Verificar si tiene las columnas del formato simple
-            simple_columns = list(self.SIMPLE_FORMAT_CONFIG['column_mapping'].keys())
-            if any(col in df_test.columns for col in simple_columns):
-                logger.info("Formato detectado: Simple (separador ',', encoding 'utf-8')")
-                return self.SIMPLE_FORMAT_CONFIG
-        except Exception as e:
-            logger.debug(f"No es formato simple: {e}")
         
-        raise CSVParseError("No se pudo detectar el formato del CSV. Formatos soportados: banco y simple")
+        format_config, header_row = detected
+        logger.info(
+            f"Formato detectado: {format_config['source']} (separador '{format_config['separator']}', "
+            f"encoding '{format_config['encoding']}', cabecera en la línea {header_row + 1})"
+        )
+        return {**format_config, 'skiprows': header_row}
     
     def parse_amount(self, amount_str: str) -> float:
         """
@@ -177,12 +154,14 @@ class TransactionCSVParser:
         
         return concept
     
-    def parse(self, content: bytes) -> List[Dict]:
+    def parse(self, content: bytes, vectorized: bool = True) -> List[Dict]:
         """
         Parsea el contenido del CSV y retorna una lista de transacciones.
         
         Args:
             content: Contenido del archivo en bytes
+            vectorized: Si es True procesa columnas completas con operaciones
+                de pandas; si es False usa el recorrido fila a fila original
             
         Returns:
             Lista de diccionarios con las transacciones parseadas
@@ -198,23 +177,155 @@ class TransactionCSVParser:
         
         # Leer CSV con la configuración detectada
         try:
-            df = pd.read_csv(
-                io.BytesIO(content),
-                sep=format_config['separator'],
-                encoding=format_config['encoding'],
-                skiprows=format_config['skiprows']
-            )
+            df = pd.read_csv(io.BytesIO(content), **self._read_options(format_config))
             logger.info(f"CSV leído exitosamente. Filas: {len(df)}, Columnas: {list(df.columns)}")
         except Exception as e:
             logger.error(f"Error al leer CSV: {e}")
             raise CSVParseError(f"Error al leer el archivo CSV: {str(e)}")
         
-        # Mapear columnas
-        column_mapping = format_config['column_mapping']
-        
         # Verificar que existan las columnas necesarias
+        self._check_columns(df, format_config)
+        
+        # Parsear transacciones
+        if vectorized:
+            transactions, errors = self._parse_vectorized(df, format_config)
+        else:
+            transactions, errors = self._parse_rows(df, format_config)
+        self.error_count = len(errors)
+        self.errors = errors[:5]
+        
+        logger.info(f"Parsing completado. Transacciones válidas: {len(transactions)}, Errores: {len(errors)}")
+        
+        if errors and len(transactions) == 0:
+            raise CSVParseError(f"No se pudo parsear ninguna transacción. Errores: {'; '.join(errors[:5])}")
+        
+        return transactions
+    
+    def detect_stream_format(self, stream: BinaryIO) -> Dict:
+        """
+        Detecta el formato con una muestra inicial del stream y deja el stream
+        de nuevo al principio.
+        
+        Args:
+            stream: Archivo binario abierto en modo lectura (debe permitir seek)
+            
+        Returns:
+            Configuración del formato detectado
+        """
+        sample = stream.read(self.DETECTION_SAMPLE_SIZE + 1)
+        stream.seek(0)
+        format_config = self.detect_format(sample)
+        self.detected_format = format_config
+        return format_config
+    
+    def iter_parse(
+        self,
+        stream: BinaryIO,
+        chunksize: int = 5000,
+        format_config: Optional[Dict] = None,
+        row_offsets: Optional[List[Tuple[int, int]]] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Parsea un CSV desde un stream binario por bloques de filas, sin cargar
+        el archivo completo en memoria.
+        
+        El formato se detecta con una muestra inicial del stream, que debe
+        permitir seek (p. ej. el SpooledTemporaryFile de un UploadFile).
+        Los errores de filas se acumulan en error_count/errors igual que en parse.
+        
+        Args:
+            stream: Archivo binario abierto en modo lectura
+            chunksize: Número de filas del CSV por bloque
+            format_config: Formato ya detectado con detect_stream_format; si es
+                None se detecta aquí
+            row_offsets: Si el stream es un archivo filtrado (filter_known_blocks),
+                pares (fila del stream, filas omitidas antes) para numerar los
+                errores con la fila del archivo original
+            
+        Yields:
+            Listas de diccionarios con las transacciones parseadas de cada bloque
+            
+        Raises:
+            CSVParseError: Si hay un error al leer el CSV o no hay ninguna
+                transacción válida
+        """
+        logger.info(f"Iniciando parsing de CSV por bloques de {chunksize} filas")
+        
+        if format_config is None:
+            format_config = self.detect_stream_format(stream)
+        
+        try:
+            reader = pd.read_csv(stream, chunksize=chunksize, **self._read_options(format_config))
+        except Exception as e:
+            logger.error(f"Error al leer CSV: {e}")
+            raise CSVParseError(f"Error al leer el archivo CSV: {str(e)}")
+        
+        self.error_count = 0
+        self.errors = []
+        parsed_count = 0
+        if row_offsets:
+            offset_starts = np.array([start for start, _ in row_offsets])
+            offset_values = np.array([offset for _, offset in row_offsets])
+        
+        with reader:
+            while True:
+                try:
+                    df = next(reader)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    logger.error(f"Error al leer CSV: {e}")
+                    raise CSVParseError(f"Error al leer el archivo CSV: {str(e)}")
+                
+                self._check_columns(df, format_config)
+                if row_offsets:
+                    # Índices del archivo original, usados en los mensajes "Fila N"
+                    positions = df.index.to_numpy()
+                    df.index = positions + offset_values[np.searchsorted(offset_starts, positions, side='right') - 1]
+                
+                transactions, errors = self._parse_vectorized(df, format_config)
+                parsed_count += len(transactions)
+                self.error_count += len(errors)
+                # Solo se conservan los primeros errores para el mensaje final
+                self.errors.extend(errors[:max(0, 5 - len(self.errors))])
+                
+                if transactions:
+                    yield transactions
+        
+        logger.info(f"Parsing completado. Transacciones válidas: {parsed_count}, Errores: {self.error_count}")
+        
+        if self.error_count and parsed_count == 0:
+            raise CSVParseError(f"No se pudo parsear ninguna transacción. Errores: {'; '.join(self.errors)}")
+    
+    def _read_options(self, format_config: Dict) -> Dict:
+        """
+        Construye los argumentos de pd.read_csv para un formato.
+        
+        Args:
+            format_config: Configuración del formato detectado
+            
+        Returns:
+            Diccionario de argumentos para pd.read_csv
+        """
+        return {
+            'sep': format_config['separator'],
+            'encoding': format_config['encoding'],
+            'skiprows': format_config['skiprows']
+        }
+    
+    def _check_columns(self, df: pd.DataFrame, format_config: Dict) -> None:
+        """
+        Verifica que el DataFrame contenga las columnas requeridas por el formato.
+        
+        Args:
+            df: DataFrame leído del CSV
+            format_config: Configuración del formato detectado
+            
+        Raises:
+            CSVParseError: Si faltan columnas
+        """
         missing_columns = []
-        for original_col in column_mapping.keys():
+        for original_col in format_config['column_mapping'].keys():
             if original_col not in df.columns:
                 missing_columns.append(original_col)
         
@@ -224,37 +335,130 @@ class TransactionCSVParser:
                 f"El CSV no contiene las columnas requeridas: {', '.join(missing_columns)}. "
                 f"Columnas disponibles: {', '.join(df.columns)}"
             )
+
+    def _resolve_columns(self, column_mapping: Dict) -> Tuple[str, str, str]:
+        """
+        Obtiene los nombres de columna originales para fecha, concepto y monto.
+        
+        Args:
+            column_mapping: Mapeo columna original -> campo interno
+            
+        Returns:
+            Tupla (columna_fecha, columna_concepto, columna_monto)
+        """
+        reverse_mapping = {v: k for k, v in column_mapping.items()}
+        return reverse_mapping['date'], reverse_mapping['concept'], reverse_mapping['amount']
+    
+    def _parse_rows(self, df: pd.DataFrame, format_config: Dict) -> Tuple[List[Dict], List[str]]:
+        """
+        Parsea el DataFrame fila a fila. Se mantiene como implementación de
+        referencia y fallback del modo vectorizado.
+        
+        Args:
+            df: DataFrame leído del CSV
+            format_config: Configuración del formato detectado
+            
+        Returns:
+            Tupla (transacciones, errores)
+        """
+        date_col, concept_col, amount_col = self._resolve_columns(format_config['column_mapping'])
         
-        # Parsear transacciones
         transactions = []
         errors = []
         
         for idx, row in df.iterrows():
             try:
-                # Obtener valores según el mapeo
-                date_col = [k for k, v in column_mapping.items() if v == 'date'][0]
-                concept_col = [k for k, v in column_mapping.items() if v == 'concept'][0]
-                amount_col = [k for k, v in column_mapping.items() if v == 'amount'][0]
-                
                 # Parsear cada campo
                 date = self.parse_date(row[date_col], format_config['date_format'])
                 concept = self.clean_concept(row[concept_col])
-                amount = self.parse_amount(row[amount_col])
+                amount_cents = amount_to_cents(self.parse_amount(row[amount_col]))
                 
                 transactions.append({
                     'date': date.date(),
                     'concept': concept,
-                    'amount': amount
+                    'amount_cents': amount_cents,
+                    'dedup_key': dedup_key(date.date(), concept, amount_cents)
                 })
                 
             except Exception as e:
                 error_msg = f"Fila {idx + 1}: {str(e)}"
                 errors.append(error_msg)
-                logger.warning(error_msg)
+                logger.warning(error_msg, extra=PER_ROW)
         
-        logger.info(f"Parsing completado. Transacciones válidas: {len(transactions)}, Errores: {len(errors)}")
+        return transactions, errors
+    
+    def _parse_vectorized(self, df: pd.DataFrame, format_config: Dict) -> Tuple[List[Dict], List[str]]:
+        """
+        Parsea el DataFrame columna a columna con operaciones vectorizadas.
         
-        if errors and len(transactions) == 0:
-            raise CSVParseError(f"No se pudo parsear ninguna transacción. Errores: {'; '.join(errors[:5])}")
+        Fechas y montos se convierten con los parsers compilados del formato.
+        Las filas que no se pueden convertir en bloque se reintentan con
+        parse_date/parse_amount, de modo que los valores aceptados y los
+        mensajes de error ("Fila N: ...") coinciden con el modo fila a fila
+        (salvo montos sin decimales con separador de miles, p. ej. '1.234€' en
+        el formato banco, que ahora se leen según la convención del formato).
+        Los montos se devuelven en céntimos (amount_cents); los que tienen más
+        de dos decimales se redondean al céntimo. Cada transacción incluye su
+        clave de duplicado (dedup_key).
         
-        return transactions
+        Args:
+            df: DataFrame leído del CSV
+            format_config: Configuración del formato detectado
+            
+        Returns:
+            Tupla (transacciones, errores)
+        """
+        date_col, concept_col, amount_col = self._resolve_columns(format_config['column_mapping'])
+        date_format = format_config['date_format']
+        
+        # Fechas: conversión en bloque con el parser compilado del formato
+        raw_dates = df[date_col]
+        date_strings = raw_dates.astype(str).str.strip()
+        dates = format_config['date_parser'](date_strings)
+        
+        # Conceptos: mismo criterio que clean_concept
+        raw_concepts = df[concept_col]
+        concepts = raw_concepts.astype(str).str.strip().str.replace(r'\s+', ' ', regex=True)
+        concepts = concepts.where(raw_concepts.notna(), "Sin concepto")
+        
+        # Montos: céntimos exactos con el decodificador del formato
+        raw_amounts = df[amount_col]
+        cents, invalid_amounts = format_config['amount_decoder'].decode(raw_amounts)
+        
+        date_values = dates.dt.date.tolist()
+        concept_values = concepts.tolist()
+        cent_values = cents.tolist()
+        
+        # Filas que no se pudieron convertir en bloque: reintento individual
+        failed_positions = set(np.flatnonzero(dates.isna().to_numpy() | invalid_amounts))
+        
+        transactions = []
+        errors = []
+        
+        for position, idx in enumerate(df.index):
+            if position in failed_positions:
+                try:
+                    date_value = date_values[position]
+                    if pd.isna(dates.iat[position]):
+                        date_value = self.parse_date(raw_dates.iat[position], date_format).date()
+                    cents_value = cent_values[position]
+                    if invalid_amounts[position]:
+                        cents_value = amount_to_cents(self.parse_amount(raw_amounts.iat[position]))
+                except Exception as e:
+                    error_msg = f"Fila {idx + 1}: {str(e)}"
+                    errors.append(error_msg)
+                    logger.warning(error_msg, extra=PER_ROW)
+                    continue
+            else:
+                date_value = date_values[position]
+                cents_value = cent_values[position]
+            
+            concept_value = concept_values[position]
+            transactions.append({
+                'date': date_value,
+                'concept': concept_value,
+                'amount_cents': cents_value,
+                'dedup_key': dedup_key(date_value, concept_value, cents_value)
+            })
+        
+        return transactions, errors
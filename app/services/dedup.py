@@ -0,0 +1,27 @@
+import hashlib
+from datetime import date
+
+# Separador de los campos de la clave (no aparece en conceptos limpios)
+FIELD_SEPARATOR = '\x1f'
+
+
+def dedup_key(transaction_date: date, concept: str, amount_cents: int) -> int:
+    """
+    Clave de duplicado compacta de una transacción: hash BLAKE2b de 64 bits de
+    la fecha ISO, el concepto limpio y el monto en céntimos, como entero con
+    signo (cabe en BIGINT).
+
+    Con 64 bits la probabilidad de colisión es despreciable para el volumen de
+    movimientos de una cuenta (~1e-8 con 500.000 transacciones).
+
+    Args:
+        transaction_date: Fecha de la transacción
+        concept: Concepto ya normalizado por el parser
+        amount_cents: Monto en céntimos
+
+    Returns:
+        Clave de 64 bits con signo
+    """
+    payload = FIELD_SEPARATOR.join((transaction_date.isoformat(), concept, str(amount_cents)))
+    digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
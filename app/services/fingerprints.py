@@ -0,0 +1,278 @@
+import hashlib
+import io
+import tempfile
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.import_fingerprint import ImportFingerprint, ImportFingerprintBlock
+from app.services.transaction_store import supports_on_conflict
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Los tramos se cortan tras las filas cuyo hash es múltiplo de este valor
+# (tramos de ~32 filas de media). Como el corte depende solo del contenido de
+# cada fila, añadir movimientos al principio o al final de una exportación no
+# desplaza los tramos del resto del archivo.
+BLOCK_BOUNDARY_MODULUS = 32
+# Tamaño máximo de un tramo, para acotarlo cuando no aparece ningún corte
+MAX_BLOCK_ROWS = 256
+# Tamaño en memoria del archivo filtrado antes de pasar a disco
+FILTERED_SPOOL_SIZE = 8 * 1024 * 1024
+# Filas por consulta al buscar tramos conocidos
+LOOKUP_BATCH_SIZE = 500
+# Tramos por sentencia INSERT al registrar una huella
+INSERT_BATCH_SIZE = 1000
+
+# Tramo de filas de datos: (hash, filas)
+Block = Tuple[str, List[bytes]]
+
+
+def file_digest(stream: BinaryIO) -> str:
+    """
+    Calcula el SHA-256 de un archivo y deja el stream al principio.
+
+    Args:
+        stream: Archivo binario abierto en modo lectura (debe permitir seek)
+
+    Returns:
+        Hash SHA-256 en hexadecimal
+    """
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def iter_blocks(lines: Iterator[bytes]) -> Iterator[Block]:
+    """
+    Agrupa las filas de datos en tramos definidos por su contenido.
+
+    Las filas se normalizan sin el salto de línea final y las vacías se
+    descartan.
+
+    Args:
+        lines: Filas de datos en bytes
+
+    Yields:
+        Tuplas (hash SHA-256 del tramo, filas del tramo)
+    """
+    rows: List[bytes] = []
+    digest = hashlib.sha256()
+    for line in lines:
+        row = line.rstrip(b'\r\n')
+        if not row.strip():
+            continue
+        rows.append(row)
+        digest.update(row + b'\n')
+        row_hash = int.from_bytes(hashlib.blake2b(row, digest_size=4).digest(), 'big')
+        if row_hash % BLOCK_BOUNDARY_MODULUS == 0 or len(rows) >= MAX_BLOCK_ROWS:
+            yield digest.hexdigest(), rows
+            rows = []
+            digest = hashlib.sha256()
+    if rows:
+        yield digest.hexdigest(), rows
+
+
+def content_blocks(content: bytes, header_lines: int) -> List[Tuple[str, int]]:
+    """
+    Calcula los tramos de filas de datos de un archivo en memoria.
+
+    Args:
+        content: Contenido del archivo en bytes
+        header_lines: Líneas previas a los datos (preámbulo y cabecera)
+
+    Returns:
+        Tramos del archivo como (hash, número de filas)
+    """
+    lines = iter(io.BytesIO(content))
+    for _ in zip(range(header_lines), lines):
+        pass
+    return [(block_hash, len(rows)) for block_hash, rows in iter_blocks(lines)]
+
+
+def find_fingerprint(db: Session, sha256: str) -> Optional[ImportFingerprint]:
+    """Busca la huella de un archivo ya importado."""
+    return db.get(ImportFingerprint, sha256)
+
+
+def fetch_known_blocks(db: Session, block_hashes: List[str]) -> Set[str]:
+    """
+    Obtiene los hashes de tramo ya registrados por archivos anteriores.
+
+    Args:
+        db: Sesión de base de datos
+        block_hashes: Hashes a comprobar
+
+    Returns:
+        Set con los hashes conocidos
+    """
+    known = set()
+    unique_hashes = list(set(block_hashes))
+    for start in range(0, len(unique_hashes), LOOKUP_BATCH_SIZE):
+        rows = db.query(ImportFingerprintBlock.block_hash).filter(
+            ImportFingerprintBlock.block_hash.in_(unique_hashes[start:start + LOOKUP_BATCH_SIZE])
+        ).distinct().all()
+        known.update(row[0] for row in rows)
+    return known
+
+
+def filter_known_blocks(
+    db: Session,
+    stream: BinaryIO,
+    header_lines: int
+) -> Tuple[BinaryIO, int, List[Tuple[str, int]], List[Tuple[int, int]]]:
+    """
+    Elimina del archivo los tramos de filas ya importados por archivos
+    anteriores, conservando el preámbulo y la cabecera.
+
+    El archivo filtrado es un SpooledTemporaryFile que debe cerrar quien
+    llama. Para que los errores de parsing indiquen la fila del archivo
+    original se devuelven los desplazamientos de numeración: cada par
+    (fila de datos en el archivo filtrado, filas omitidas antes de ella)
+    vale hasta el siguiente par.
+
+    Args:
+        db: Sesión de base de datos
+        stream: Archivo CSV binario (debe permitir seek)
+        header_lines: Líneas previas a los datos (preámbulo y cabecera)
+
+    Returns:
+        Tupla (archivo filtrado al principio, filas omitidas,
+        tramos del archivo como (hash, número de filas),
+        desplazamientos de numeración de filas)
+    """
+    def data_lines() -> Iterator[bytes]:
+        lines = iter(stream)
+        for _ in zip(range(header_lines), lines):
+            pass
+        return lines
+
+    # Primera pasada: hashes de los tramos, sin retener las filas en memoria
+    blocks = [(block_hash, len(rows)) for block_hash, rows in iter_blocks(data_lines())]
+    known = fetch_known_blocks(db, [block_hash for block_hash, _ in blocks])
+
+    # Segunda pasada: preámbulo, cabecera y tramos no importados
+    stream.seek(0)
+    filtered = tempfile.SpooledTemporaryFile(max_size=FILTERED_SPOOL_SIZE)
+    for _, line in zip(range(header_lines), stream):
+        filtered.write(line)
+    stream.seek(0)
+    skipped_rows = 0
+    kept_rows = 0
+    row_offsets: List[Tuple[int, int]] = []
+    for block_hash, rows in iter_blocks(data_lines()):
+        if block_hash in known:
+            skipped_rows += len(rows)
+            continue
+        if not row_offsets or row_offsets[-1][1] != skipped_rows:
+            row_offsets.append((kept_rows, skipped_rows))
+        filtered.writelines(row + b'\n' for row in rows)
+        kept_rows += len(rows)
+    filtered.seek(0)
+    stream.seek(0)
+
+    logger.info(f"Huella por tramos: {len(known)}/{len(blocks)} tramos conocidos, {skipped_rows} filas omitidas")
+    return filtered, skipped_rows, blocks, row_offsets
+
+
+def register_fingerprint(
+    db: Session,
+    sha256: str,
+    filename: Optional[str],
+    source: Optional[str],
+    statistics: Dict,
+    blocks: List[Tuple[str, int]]
+) -> None:
+    """
+    Registra la huella de un archivo importado y sus tramos, en la misma
+    transacción que el import.
+
+    Dos imports idénticos pueden llegar a la vez (IMPORT_WORKERS > 1): la
+    huella se inserta con ON CONFLICT DO NOTHING y, si ya la registró el otro
+    import, no se hace nada. En los dialectos sin ON CONFLICT se usa un
+    savepoint y se ignora el conflicto de clave primaria.
+
+    Args:
+        db: Sesión de base de datos
+        sha256: Hash SHA-256 del archivo
+        filename: Nombre original del archivo
+        source: Formato detectado
+        statistics: Estadísticas de la respuesta del import
+        blocks: Tramos del archivo como (hash, número de filas)
+    """
+    fingerprint = {
+        'sha256': sha256,
+        'filename': filename,
+        'format_detected': source,
+        'total_rows': statistics['total_rows'],
+        'errors': statistics['errors']
+    }
+    block_rows = [
+        {'fingerprint_sha256': sha256, 'block_hash': block_hash, 'row_count': row_count}
+        for block_hash, row_count in dict(blocks).items()
+    ]
+
+    if not supports_on_conflict(db):
+        if find_fingerprint(db, sha256) is not None:
+            return
+        try:
+            with db.begin_nested():
+                db.add(ImportFingerprint(**fingerprint))
+                db.add_all(ImportFingerprintBlock(**row) for row in block_rows)
+        except IntegrityError:
+            logger.info(f"Huella {sha256[:12]} ya registrada por otro import")
+        return
+
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    registered = db.execute(
+        dialect_insert(ImportFingerprint)
+        .values(fingerprint)
+        .on_conflict_do_nothing(index_elements=['sha256'])
+        .returning(ImportFingerprint.sha256)
+    ).first()
+    if registered is None:
+        logger.info(f"Huella {sha256[:12]} ya registrada por otro import")
+        return
+    for start in range(0, len(block_rows), INSERT_BATCH_SIZE):
+        db.execute(
+            dialect_insert(ImportFingerprintBlock)
+            .values(block_rows[start:start + INSERT_BATCH_SIZE])
+            .on_conflict_do_nothing(index_elements=['fingerprint_sha256', 'block_hash'])
+        )
+
+
+def cached_statistics(fingerprint: ImportFingerprint) -> Dict:
+    """
+    Estadísticas de reimportar un archivo ya importado: todas sus filas
+    válidas son duplicadas.
+
+    Args:
+        fingerprint: Huella del archivo
+
+    Returns:
+        Estadísticas con el mismo formato que las de un import
+    """
+    return {
+        "total_rows": fingerprint.total_rows,
+        "new_transactions": 0,
+        "duplicates_skipped": fingerprint.total_rows,
+        "errors": fingerprint.errors
+    }
+
+
+def clear_fingerprints(db: Session) -> None:
+    """
+    Elimina el registro de huellas, sin hacer commit.
+
+    Se llama al borrar transacciones: un archivo cuyas filas ya no están en
+    la base de datos debe volver a importarse completo.
+
+    Args:
+        db: Sesión de base de datos
+    """
+    db.query(ImportFingerprintBlock).delete(synchronize_session=False)
+    db.query(ImportFingerprint).delete(synchronize_session=False)
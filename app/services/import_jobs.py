@@ -0,0 +1,177 @@
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+from app.db.session import SessionLocal
+from app.models.import_job import ImportJob
+from app.services.csv_parser import CSVParseError
+from app.services.importer import import_transactions
+from app.core.config import settings
+from app.core.logger import row_log_scope, setup_logger
+
+logger = setup_logger(__name__)
+
+# Pool acotado: como máximo IMPORT_WORKERS imports simultáneos, y por tanto
+# un número acotado de conexiones a la base de datos dedicadas a imports
+_executor = ThreadPoolExecutor(max_workers=settings.IMPORT_WORKERS, thread_name_prefix="import")
+
+
+def _update_job(job_id: str, **fields) -> None:
+    """
+    Actualiza un trabajo en su propia sesión, para que el progreso sea visible
+    mientras la transacción del import sigue abierta.
+
+    Args:
+        job_id: ID del trabajo
+        fields: Columnas a actualizar
+    """
+    db = SessionLocal()
+    try:
+        db.query(ImportJob).filter(ImportJob.id == job_id).update(fields, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _report_progress(job_id: str, stats: Dict) -> None:
+    """
+    Publica los contadores del import tras cada bloque. Un fallo al publicar
+    el progreso no interrumpe el import.
+
+    Args:
+        job_id: ID del trabajo
+        stats: Contadores del import
+    """
+    try:
+        _update_job(
+            job_id,
+            rows_parsed=stats['total'],
+            inserted=stats['processed'],
+            duplicates=stats['duplicates'],
+            errors=stats['errors']
+        )
+    except Exception as e:
+        logger.warning(f"No se pudo actualizar el progreso del import {job_id}: {e}")
+
+
+def _run_job(job_id: str, path: str, filename: Optional[str]) -> Dict:
+    """
+    Ejecuta un import en un hilo del pool y registra su resultado.
+
+    Args:
+        job_id: ID del trabajo
+        path: Ruta del CSV almacenado
+        filename: Nombre original del archivo
+
+    Returns:
+        Respuesta del import (ver import_transactions)
+    """
+    logger.info(f"Import {job_id} iniciado")
+    db = SessionLocal()
+    try:
+        _update_job(job_id, status="running", started_at=datetime.now(timezone.utc))
+
+        # SQLite solo admite un escritor: el progreso intermedio esperaría al
+        # commit del propio import, así que solo se publica el resultado final
+        on_progress = None
+        if db.get_bind().dialect.name != "sqlite":
+            on_progress = lambda stats: _report_progress(job_id, stats)
+
+        with open(path, 'rb') as stream, row_log_scope(f"Import {job_id}"):
+            result = import_transactions(db, stream, on_progress=on_progress, filename=filename)
+        statistics = result['statistics']
+        _update_job(
+            job_id,
+            status="completed",
+            rows_parsed=statistics['total_rows'],
+            inserted=statistics['new_transactions'],
+            duplicates=statistics['duplicates_skipped'],
+            errors=statistics['errors'],
+            format_detected=result['format_detected'],
+            finished_at=datetime.now(timezone.utc)
+        )
+        logger.info(f"Import {job_id} completado")
+        return result
+    except Exception as e:
+        if not isinstance(e, CSVParseError):
+            logger.error(f"Import {job_id} fallido: {e}", exc_info=True)
+        try:
+            _update_job(job_id, status="failed", error_message=str(e), finished_at=datetime.now(timezone.utc))
+        except Exception as update_error:
+            logger.error(f"No se pudo marcar el import {job_id} como fallido: {update_error}")
+        raise
+    finally:
+        db.close()
+        os.remove(path)
+
+
+def recover_interrupted_jobs() -> int:
+    """
+    Cierra los trabajos que un reinicio dejó a medias: los marca como
+    fallidos y borra los archivos pendientes de IMPORT_DIR, que ya no
+    procesará ningún hilo. Se llama al arrancar, antes de aceptar imports.
+
+    Returns:
+        Número de trabajos marcados como fallidos
+    """
+    db = SessionLocal()
+    try:
+        interrupted = db.query(ImportJob).filter(
+            ImportJob.status.in_(("pending", "running"))
+        ).update(
+            {
+                ImportJob.status: "failed",
+                ImportJob.error_message: "Import interrumpido por un reinicio del servidor",
+                ImportJob.finished_at: datetime.now(timezone.utc)
+            },
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+    if interrupted:
+        logger.warning(f"{interrupted} imports interrumpidos por un reinicio marcados como fallidos")
+
+    # Solo los archivos que crea submit_import (mkstemp: tmp*.csv)
+    for orphan in Path(settings.IMPORT_DIR).glob("tmp*.csv"):
+        try:
+            orphan.unlink()
+            logger.info(f"Archivo de import huérfano eliminado: {orphan}")
+        except OSError as e:
+            logger.warning(f"No se pudo eliminar el archivo de import huérfano {orphan}: {e}")
+    return interrupted
+
+
+def submit_import(filename: Optional[str], stream: BinaryIO) -> Tuple[str, Future]:
+    """
+    Almacena el archivo subido, registra el trabajo y lo encola en el pool.
+
+    Args:
+        filename: Nombre original del archivo
+        stream: Contenido binario del archivo
+
+    Returns:
+        Tupla (ID del trabajo, Future con la respuesta del import)
+    """
+    Path(settings.IMPORT_DIR).mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=settings.IMPORT_DIR)
+    with os.fdopen(fd, 'wb') as destination:
+        shutil.copyfileobj(stream, destination)
+
+    job_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(ImportJob(id=job_id, filename=filename, status="pending"))
+        db.commit()
+    except Exception:
+        os.remove(path)
+        raise
+    finally:
+        db.close()
+
+    logger.info(f"Import {job_id} encolado: {filename}")
+    return job_id, _executor.submit(_run_job, job_id, path, filename)
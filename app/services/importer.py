@@ -0,0 +1,273 @@
+from typing import BinaryIO, Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.services.classification_rules import refresh_rules
+from app.services.classifier import classify_many, classifier_cache_info
+from app.services.csv_parser import TransactionCSVParser, CSVParseError
+from app.services.fingerprints import (
+    file_digest, find_fingerprint, filter_known_blocks, register_fingerprint, cached_statistics
+)
+from app.services.response_cache import response_cache
+from app.services.rollup import apply_rollup_delta
+from app.services.transaction_store import (
+    begin_savepoint, split_duplicates, insert_transactions, supports_on_conflict
+)
+from app.core.config import settings
+from app.core.logger import PER_ROW, setup_logger
+from app.core.metrics import import_rows, stage_timer
+
+logger = setup_logger(__name__)
+
+
+class ImportStorageError(Exception):
+    """Excepción para errores al guardar transacciones importadas en la base de datos"""
+    pass
+
+
+def detected_source(parser: TransactionCSVParser) -> str:
+    """Determina el source de las transacciones según el formato detectado."""
+    return parser.detected_format['source']
+
+
+def store_rows(db: Session, rows: List[Dict]) -> List[Dict]:
+    """
+    Inserta filas ya clasificadas y suma las insertadas al agregado de
+    estadísticas, sin hacer commit.
+
+    Args:
+        db: Sesión de base de datos
+        rows: Filas a insertar
+
+    Returns:
+        Filas insertadas (sin las rechazadas por conflicto de dedup_key)
+    """
+    inserted_rows = insert_transactions(db, rows, batch_size=settings.INSERT_BATCH_SIZE)
+    # Mantener el agregado de estadísticas en la misma transacción
+    apply_rollup_delta(db, inserted_rows)
+    return inserted_rows
+
+
+def process_batch(db: Session, batch: List[Dict], source: str, stats: Dict) -> None:
+    """
+    Deduplica, clasifica e inserta un bloque de transacciones parseadas.
+
+    Si el bloque no se puede guardar, se reintenta fila a fila: las filas que
+    siguen fallando se descartan y se cuentan en stats['errors'].
+
+    Args:
+        db: Sesión de base de datos
+        batch: Transacciones parseadas del bloque
+        source: Origen de las transacciones ('csv_bank', 'csv_simple')
+        stats: Contadores del import, se actualizan en el sitio
+    """
+    # Descartar los duplicados dentro del bloque; los ya guardados los rechaza
+    # el propio INSERT por dedup_key (o la consulta previa sin ON CONFLICT)
+    with stage_timer('dedup'):
+        new_transactions, duplicates = split_duplicates(db, batch, check_database=not supports_on_conflict(db))
+    stats['duplicates'] += duplicates
+
+    # Clasificar el bloque completo, una sola vez por concepto distinto
+    with stage_timer('classify'):
+        categories = classify_many(trans_data['concept'] for trans_data in new_transactions)
+
+    rows = [
+        {
+            'date': trans_data['date'],
+            'concept': trans_data['concept'],
+            'amount_cents': trans_data['amount_cents'],
+            'dedup_key': trans_data['dedup_key'],
+            'category': category,
+            'source': source
+        }
+        for trans_data, category in zip(new_transactions, categories)
+    ]
+
+    with stage_timer('persist'):
+        # Guardar el bloque en un savepoint; si falla, se reintenta fila a fila
+        # para que una fila inválida cuente como error sin abortar el import
+        failed = 0
+        try:
+            with begin_savepoint(db):
+                inserted_rows = store_rows(db, rows)
+        except Exception as e:
+            logger.warning(f"Error al guardar el bloque, reintentando fila a fila: {e}")
+            inserted_rows = []
+            for row in rows:
+                try:
+                    with begin_savepoint(db):
+                        inserted_rows.extend(store_rows(db, [row]))
+                except Exception as row_error:
+                    failed += 1
+                    logger.error(f"Error al guardar transacción '{row['concept'][:50]}': {row_error}", extra=PER_ROW)
+
+    # Las filas rechazadas por conflicto cuentan como duplicadas
+    stats['processed'] += len(inserted_rows)
+    stats['duplicates'] += len(rows) - len(inserted_rows) - failed
+    stats['errors'] += failed
+
+
+def record_import_rows(statistics: Dict) -> None:
+    """
+    Suma las filas de un import confirmado a la métrica import_rows_total.
+
+    Args:
+        statistics: Estadísticas del import (new_transactions,
+            duplicates_skipped y errors)
+    """
+    import_rows.inc(statistics['new_transactions'], result='inserted')
+    import_rows.inc(statistics['duplicates_skipped'], result='duplicate')
+    import_rows.inc(statistics['errors'], result='error')
+
+
+def import_transactions(
+    db: Session,
+    stream: BinaryIO,
+    on_progress: Optional[Callable[[Dict], None]] = None,
+    filename: Optional[str] = None
+) -> Dict:
+    """
+    Importa un CSV completo: lo parsea por bloques, deduplica, clasifica y
+    guarda cada bloque, y confirma todo en una única transacción.
+
+    Con IMPORT_FINGERPRINTS_ENABLED, un archivo idéntico a uno ya importado
+    responde con sus estadísticas sin parsearse, y de una exportación que se
+    solapa con otras anteriores solo se parsean los tramos de filas nuevos.
+
+    Args:
+        db: Sesión de base de datos
+        stream: Archivo CSV binario (debe permitir seek)
+        on_progress: Función opcional que recibe los contadores tras cada bloque
+        filename: Nombre original del archivo, para el registro de huellas
+
+    Returns:
+        Respuesta con mensaje, estadísticas, formato detectado y huella
+
+    Raises:
+        CSVParseError: Si el CSV no se puede parsear
+        ImportStorageError: Si falla el guardado en base de datos
+    """
+    parser = TransactionCSVParser()
+    # Usar las reglas de clasificación vigentes (pueden haber cambiado en otro worker)
+    refresh_rules(db)
+
+    # Estadísticas
+    stats = {
+        'total': 0,
+        'processed': 0,
+        'duplicates': 0,
+        'errors': 0
+    }
+    source = None
+    sha256 = None
+    blocks = []
+    skipped_rows = 0
+    row_offsets = None
+    filtered = None
+
+    if settings.IMPORT_FINGERPRINTS_ENABLED:
+        with stage_timer('fingerprint'):
+            sha256 = file_digest(stream)
+            fingerprint = find_fingerprint(db, sha256)
+        if fingerprint is not None:
+            logger.info(f"Archivo ya importado ({sha256[:12]}): se omite el parsing")
+            statistics = cached_statistics(fingerprint)
+            import_rows.inc(statistics['total_rows'], result='duplicate')
+            return {
+                "message": "Archivo ya importado anteriormente",
+                "statistics": statistics,
+                "format_detected": fingerprint.format_detected,
+                "fingerprint": {"sha256": sha256, "match": "file", "skipped_rows": fingerprint.total_rows}
+            }
+
+    with stage_timer('detect'):
+        try:
+            format_config = parser.detect_stream_format(stream)
+        except CSVParseError as e:
+            logger.error(f"Error al parsear CSV: {e}")
+            raise
+
+    if sha256:
+        # Omitir los tramos de filas ya importados por otros archivos
+        with stage_timer('fingerprint'):
+            filtered, skipped_rows, blocks, row_offsets = filter_known_blocks(
+                db, stream, format_config['skiprows'] + 1
+            )
+        stream = filtered
+        stats['total'] += skipped_rows
+        stats['duplicates'] += skipped_rows
+
+    # Leer, parsear y guardar el archivo por bloques para acotar la memoria
+    try:
+        batches = parser.iter_parse(
+            stream, chunksize=settings.UPLOAD_CHUNK_SIZE, format_config=format_config, row_offsets=row_offsets
+        )
+        while True:
+            with stage_timer('parse'):
+                batch = next(batches, None)
+            if batch is None:
+                break
+
+            if source is None:
+                source = detected_source(parser)
+                logger.info(f"Formato detectado: {source}")
+
+            stats['total'] += len(batch)
+
+            # Guardar el bloque en la base de datos sin cerrar la transacción
+            try:
+                process_batch(db, batch, source, stats)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error al guardar en base de datos: {e}")
+                raise ImportStorageError(f"Error al guardar transacciones: {str(e)}")
+
+            logger.info(f"Bloque procesado: {stats['total']} transacciones parseadas hasta ahora")
+            if on_progress:
+                on_progress(stats)
+    except CSVParseError as e:
+        db.rollback()
+        logger.error(f"Error al parsear CSV: {e}")
+        raise
+    finally:
+        # El archivo filtrado (SpooledTemporaryFile) puede haber pasado a disco
+        if filtered is not None:
+            filtered.close()
+
+    logger.info(f"CSV parseado exitosamente: {stats['total']} transacciones encontradas")
+
+    statistics = {
+        "total_rows": stats['total'],
+        "new_transactions": stats['processed'],
+        "duplicates_skipped": stats['duplicates'],
+        "errors": stats['errors']
+    }
+
+    # Commit de todas las transacciones junto con la huella del archivo
+    try:
+        with stage_timer('persist'):
+            # Con filas no guardadas el archivo no se registra: al reimportarlo
+            # deben volver a intentarse
+            if sha256 and not stats['errors']:
+                register_fingerprint(db, sha256, filename, detected_source(parser), statistics, blocks)
+            db.commit()
+        logger.info(f"Transacciones guardadas en base de datos: {stats['processed']} nuevas")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al guardar en base de datos: {e}")
+        raise ImportStorageError(f"Error al guardar transacciones: {str(e)}")
+
+    record_import_rows(statistics)
+    if stats['processed']:
+        response_cache.invalidate()
+
+    # Respuesta con estadísticas
+    response = {
+        "message": "Procesamiento completado",
+        "statistics": statistics,
+        "format_detected": detected_source(parser)
+    }
+    if sha256:
+        response["fingerprint"] = {"sha256": sha256, "match": "blocks" if skipped_rows else "none", "skipped_rows": skipped_rows}
+
+    logger.info(f"Import completado: {response}")
+    logger.info(f"Caché del clasificador: {classifier_cache_info()}")
+    return response
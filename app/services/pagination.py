@@ -0,0 +1,41 @@
+import base64
+from datetime import date
+from typing import Tuple
+
+
+def encode_cursor(transaction_date: date, transaction_id: int) -> str:
+    """
+    Codifica la posición (date, id) de la última transacción de una página
+    como un cursor opaco.
+
+    Args:
+        transaction_date: Fecha de la transacción
+        transaction_id: ID de la transacción
+
+    Returns:
+        Cursor en base64 url-safe
+    """
+    raw = f"{transaction_date.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """
+    Decodifica un cursor generado por encode_cursor.
+
+    Args:
+        cursor: Cursor opaco
+
+    Returns:
+        Tupla (fecha, id)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        date_part, id_part = raw.split('|')
+        return date.fromisoformat(date_part), int(id_part)
+    except Exception:
+        raise ValueError(f"Cursor inválido: '{cursor}'")
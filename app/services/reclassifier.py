@@ -0,0 +1,141 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Integer, String, column, select, update, values
+from sqlalchemy.orm import Session
+from app.models.transaction import Transaction
+from app.services.classification_rules import refresh_rules
+from app.services.response_cache import response_cache
+from app.services.rollup import apply_rollup_delta
+from app.core.config import settings
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# IDs por sentencia UPDATE ... WHERE id IN (...) en los dialectos sin UPDATE ... FROM (VALUES)
+UPDATE_CHUNK_SIZE = 1000
+
+
+class ReclassificationError(Exception):
+    """Excepción para errores al guardar una reclasificación"""
+    pass
+
+
+def write_categories(db: Session, changes: List[Tuple[int, str]]) -> None:
+    """
+    Escribe las nuevas categorías de un lote con sentencias de conjunto.
+
+    En PostgreSQL se usa un único UPDATE ... FROM (VALUES (id, categoría), ...);
+    en otros dialectos, un UPDATE ... WHERE id IN (...) por categoría destino.
+
+    Args:
+        db: Sesión de base de datos
+        changes: Pares (id, nueva categoría) de las filas que cambian
+    """
+    if not changes:
+        return
+
+    if db.get_bind().dialect.name == "postgresql":
+        new_categories = values(
+            column('id', Integer), column('category', String), name='new_categories'
+        ).data(changes)
+        db.execute(
+            update(Transaction)
+            .where(Transaction.id == new_categories.c.id)
+            .values(category=new_categories.c.category)
+            .execution_options(synchronize_session=False)
+        )
+        return
+
+    ids_by_category: Dict[str, List[int]] = {}
+    for transaction_id, category in changes:
+        ids_by_category.setdefault(category, []).append(transaction_id)
+    for category, ids in ids_by_category.items():
+        for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+            db.execute(
+                update(Transaction)
+                .where(Transaction.id.in_(ids[start:start + UPDATE_CHUNK_SIZE]))
+                .values(category=category)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def reclassify_transactions(db: Session, batch_size: Optional[int] = None) -> Dict:
+    """
+    Vuelve a clasificar todas las transacciones guardadas con la tabla de
+    keywords vigente.
+
+    Las filas se leen por lotes con un cursor de servidor (yield_per), sin
+    cargar la tabla en memoria; cada concepto distinto se clasifica una sola
+    vez y solo se escriben las filas cuya categoría cambia. El agregado de
+    estadísticas se corrige en la misma transacción y todo se confirma con un
+    único commit.
+
+    Args:
+        db: Sesión de base de datos
+        batch_size: Filas por lote (por defecto RECLASSIFY_BATCH_SIZE)
+
+    Returns:
+        Respuesta con estadísticas globales y cambios por categoría
+
+    Raises:
+        ReclassificationError: Si falla la escritura en base de datos
+    """
+    batch_size = batch_size or settings.RECLASSIFY_BATCH_SIZE
+    classifier = refresh_rules(db)
+    resolved: Dict[str, str] = {}
+    gained = Counter()
+    lost = Counter()
+    scanned = 0
+    changed = 0
+
+    statement = select(
+        Transaction.id, Transaction.date, Transaction.concept, Transaction.category, Transaction.amount_cents
+    ).order_by(Transaction.id).execution_options(yield_per=batch_size)
+
+    try:
+        for rows in db.execute(statement).partitions():
+            changes = []
+            removed = []
+            added = []
+            for transaction_id, transaction_date, concept, old_category, amount_cents in rows:
+                category = resolved.get(concept)
+                if category is None:
+                    category = resolved[concept] = classifier.classify(concept)
+                if category == old_category:
+                    continue
+                changes.append((transaction_id, category))
+                removed.append({'date': transaction_date, 'category': old_category, 'amount_cents': amount_cents})
+                added.append({'date': transaction_date, 'category': category, 'amount_cents': amount_cents})
+                gained[category] += 1
+                lost[old_category] += 1
+
+            write_categories(db, changes)
+            apply_rollup_delta(db, removed, direction=-1)
+            apply_rollup_delta(db, added)
+            scanned += len(rows)
+            changed += len(changes)
+            logger.info(f"Reclasificación: {scanned} transacciones revisadas, {changed} cambiadas")
+
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al reclasificar transacciones: {e}")
+        raise ReclassificationError(f"Error al reclasificar transacciones: {str(e)}")
+
+    if changed:
+        response_cache.invalidate()
+
+    categories = sorted(set(gained) | set(lost), key=lambda category: (category is None, category or ''))
+    logger.info(f"Reclasificación completada: {changed} de {scanned} transacciones cambiadas")
+    return {
+        "message": "Reclasificación completada",
+        "statistics": {
+            "scanned": scanned,
+            "distinct_concepts": len(resolved),
+            "changed": changed
+        },
+        "by_category": [
+            {"category": category, "gained": gained[category], "lost": lost[category]}
+            for category in categories
+        ]
+    }
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.logger import setup_logger
+from app.core.metrics import metrics
+
+logger = setup_logger(__name__)
+
+# Entrada cacheada: (etag, cuerpo JSON)
+CacheEntry = Tuple[str, bytes]
+
+
+class InMemoryCacheBackend:
+    """
+    Backend en proceso: LRU acotado por número de entradas, con TTL por entrada
+    y contador de versión local. Válido con un solo worker de uvicorn.
+    """
+
+    # Operaciones en memoria: no bloquean el bucle de eventos
+    blocking = False
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_version(self) -> int:
+        return self._version
+
+    def bump_version(self) -> int:
+        with self._lock:
+            self._version += 1
+            # Las entradas de versiones anteriores ya no son alcanzables
+            self._entries.clear()
+            return self._version
+
+
+class RedisCacheBackend:
+    """
+    Backend compartido sobre un servidor compatible con Redis (GET/SET EX/INCR),
+    para varios workers. Requiere el paquete opcional 'redis'.
+
+    Si Redis no responde, la caché se degrada sin fallar la petición: una
+    lectura cuenta como fallo de caché y una escritura no hace nada.
+    """
+
+    VERSION_KEY = "analizador:cache:version"
+    KEY_PREFIX = "analizador:cache:"
+    # Cada operación es una ida y vuelta de red: fuera del bucle de eventos
+    blocking = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND='redis' requiere instalar el paquete 'redis'")
+        self._client = redis.Redis.from_url(url)
+        self._redis_error = redis.exceptions.RedisError
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            raw = self._client.get(self.KEY_PREFIX + key)
+        except self._redis_error as e:
+            logger.warning(f"Redis no disponible al leer la caché: {e}")
+            return None
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b'\n')
+        return etag.decode('ascii'), body
+
+    def set(self, key: str, entry: CacheEntry, ttl: int) -> None:
+        etag, body = entry
+        try:
+            self._client.set(self.KEY_PREFIX + key, etag.encode('ascii') + b'\n' + body, ex=ttl)
+        except self._redis_error as e:
+            logger.warning(f"Redis no disponible al guardar en la caché: {e}")
+
+    def get_version(self) -> Optional[int]:
+        try:
+            return int(self._client.get(self.VERSION_KEY) or 0)
+        except self._redis_error as e:
+            # Sin versión no se puede saber si una entrada está vigente
+            logger.warning(f"Redis no disponible al leer la versión de la caché: {e}")
+            return None
+
+    def bump_version(self) -> Optional[int]:
+        try:
+            return int(self._client.incr(self.VERSION_KEY))
+        except self._redis_error as e:
+            logger.warning(f"Redis no disponible al invalidar la caché; las respuestas cacheadas caducan por TTL: {e}")
+            return None
+
+
+class ResponseCache:
+    """
+    Caché de respuestas de los endpoints de lectura.
+
+    La clave combina la versión de datos, el endpoint y los parámetros
+    normalizados. Cada escritura llama a invalidate(), que incrementa la
+    versión, de modo que las respuestas anteriores dejan de usarse.
+    Las respuestas llevan ETag y se responde 304 a If-None-Match coincidente.
+    """
+
+    def __init__(self, backend, ttl: int = 60, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def build_key(self, endpoint: str, params: Dict) -> Optional[str]:
+        """
+        Construye la clave de caché con los parámetros no nulos ordenados.
+
+        Args:
+            endpoint: Nombre del endpoint
+            params: Parámetros de la petición
+
+        Returns:
+            Clave de caché, o None si el backend no puede dar la versión actual
+        """
+        version = self.backend.get_version()
+        if version is None:
+            return None
+        normalized = json.dumps(
+            {name: value for name, value in jsonable_encoder(params).items() if value is not None},
+            sort_keys=True,
+            separators=(',', ':')
+        )
+        return f"v{version}:{endpoint}:{normalized}"
+
+    def respond(self, request: Request, endpoint: str, params: Dict, compute: Callable) -> Response:
+        """
+        Devuelve la respuesta cacheada o la calcula, la guarda y la devuelve.
+
+        Args:
+            request: Petición entrante (para If-None-Match)
+            endpoint: Nombre del endpoint
+            params: Parámetros que determinan la respuesta
+            compute: Función sin argumentos que calcula el modelo de respuesta
+
+        Returns:
+            Response JSON con ETag, o 304 sin cuerpo si el cliente ya la tiene
+        """
+        key, entry = self._lookup(endpoint, params)
+        if entry is None:
+            entry = self._store(key, compute())
+        return self._build_response(request, entry)
+
+    async def respond_async(self, request: Request, endpoint: str, params: Dict, compute: Callable) -> Response:
+        """
+        Versión de respond para endpoints asíncronos.
+
+        Args:
+            request: Petición entrante (para If-None-Match)
+            endpoint: Nombre del endpoint
+            params: Parámetros que determinan la respuesta
+            compute: Corrutina sin argumentos que calcula el modelo de respuesta
+
+        Returns:
+            Response JSON con ETag, o 304 sin cuerpo si el cliente ya la tiene
+        """
+        if self.backend.blocking:
+            # Las llamadas al backend (Redis) van al pool de hilos para no
+            # bloquear el bucle de eventos
+            key, entry = await run_in_threadpool(self._lookup, endpoint, params)
+            if entry is None:
+                entry = await run_in_threadpool(self._store, key, await compute())
+        else:
+            key, entry = self._lookup(endpoint, params)
+            if entry is None:
+                entry = self._store(key, await compute())
+        return self._build_response(request, entry)
+
+    def _lookup(self, endpoint: str, params: Dict) -> Tuple[Optional[str], Optional[CacheEntry]]:
+        """Calcula la clave y busca la entrada; cuenta aciertos y fallos."""
+        key = self.build_key(endpoint, params) if self.enabled else None
+        entry = self.backend.get(key) if key else None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return key, entry
+
+    def _store(self, key: Optional[str], model) -> CacheEntry:
+        """Serializa el modelo de respuesta, calcula su ETag y lo guarda."""
+        body = json.dumps(jsonable_encoder(model), separators=(',', ':')).encode('utf-8')
+        entry = ('"' + hashlib.sha1(body).hexdigest() + '"', body)
+        if key:
+            self.backend.set(key, entry, self.ttl)
+        return entry
+
+    def _build_response(self, request: Request, entry: CacheEntry) -> Response:
+        """Construye la respuesta 200 con ETag, o 304 si el cliente ya la tiene."""
+        etag, body = entry
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        client_etags = _parse_if_none_match(request.headers.get('if-none-match'))
+        if etag in client_etags or '*' in client_etags:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type='application/json', headers=headers)
+
+    def invalidate(self) -> None:
+        """Invalida todas las respuestas cacheadas tras una escritura."""
+        version = self.backend.bump_version()
+        if version is not None:
+            logger.info(f"Caché de respuestas invalidada (versión {version})")
+
+
+def _parse_if_none_match(header: Optional[str]) -> set:
+    """Extrae los ETags de una cabecera If-None-Match (ignora el prefijo W/)."""
+    if not header:
+        return set()
+    return {tag.strip().removeprefix('W/') for tag in header.split(',')}
+
+
+def create_response_cache() -> ResponseCache:
+    """
+    Crea la caché de respuestas según la configuración.
+
+    Returns:
+        ResponseCache con el backend configurado
+    """
+    if settings.CACHE_BACKEND == "redis":
+        backend = RedisCacheBackend(settings.CACHE_REDIS_URL)
+    else:
+        backend = InMemoryCacheBackend(max_entries=settings.CACHE_MAX_ENTRIES)
+    return ResponseCache(backend, ttl=settings.CACHE_TTL_SECONDS, enabled=settings.CACHE_ENABLED)
+
+
+response_cache = create_response_cache()
+
+metrics.gauge_callback(
+    'response_cache_lookups',
+    "Búsquedas en la caché de respuestas desde el arranque, por resultado",
+    lambda: [({'result': 'hit'}, response_cache.hits), ({'result': 'miss'}, response_cache.misses)]
+)
@@ -0,0 +1,175 @@
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models.transaction import Transaction
+from app.models.transaction_rollup import TransactionRollup
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Clave del agregado: (mes 'YYYY-MM', categoría, signo)
+RollupKey = Tuple[str, str, int]
+
+
+def amount_sign(amount_cents: int) -> int:
+    """Signo de un importe: 1 ingreso, -1 gasto, 0 importe cero."""
+    if amount_cents > 0:
+        return 1
+    if amount_cents < 0:
+        return -1
+    return 0
+
+
+def month_expression(dialect_name: str):
+    """
+    Expresión SQL que formatea Transaction.date como 'YYYY-MM' según el dialecto.
+
+    Args:
+        dialect_name: Nombre del dialecto SQLAlchemy ('postgresql', 'sqlite', ...)
+
+    Returns:
+        Expresión SQLAlchemy con el mes de la transacción
+    """
+    if dialect_name == "sqlite":
+        return func.strftime('%Y-%m', Transaction.date)
+    return func.to_char(Transaction.date, 'YYYY-MM')
+
+
+def sign_expression():
+    """Expresión SQL equivalente a amount_sign sobre Transaction.amount_cents."""
+    return case((Transaction.amount_cents > 0, 1), (Transaction.amount_cents < 0, -1), else_=0)
+
+
+def aggregate_rows(rows: Iterable[Dict]) -> Dict[RollupKey, list]:
+    """
+    Agrupa transacciones en memoria por (mes, categoría, signo).
+
+    Args:
+        rows: Diccionarios con date, category y amount_cents
+
+    Returns:
+        Diccionario clave -> [count, total en céntimos]
+    """
+    deltas = {}
+    for row in rows:
+        key = (row['date'].strftime('%Y-%m'), row['category'] or '', amount_sign(row['amount_cents']))
+        delta = deltas.setdefault(key, [0, 0])
+        delta[0] += 1
+        delta[1] += row['amount_cents']
+    return deltas
+
+
+def apply_rollup_delta(db: Session, rows: Iterable[Dict], direction: int = 1) -> None:
+    """
+    Suma (direction=1) o resta (direction=-1) transacciones al agregado,
+    dentro de la transacción de base de datos actual.
+
+    En PostgreSQL y SQLite se usa un único INSERT ... ON CONFLICT DO UPDATE;
+    en otros dialectos se actualiza fila a fila con el ORM.
+
+    Args:
+        db: Sesión de base de datos
+        rows: Diccionarios con date, category y amount_cents
+        direction: 1 para altas, -1 para bajas
+    """
+    deltas = aggregate_rows(rows)
+    if not deltas:
+        return
+
+    values = [
+        {'month': month, 'category': category, 'sign': sign, 'count': direction * count, 'total_cents': direction * total}
+        for (month, category, sign), (count, total) in deltas.items()
+    ]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = pg_insert if dialect == "postgresql" else sqlite_insert
+        statement = dialect_insert(TransactionRollup).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=['month', 'category', 'sign'],
+            set_={
+                'count': TransactionRollup.count + statement.excluded.count,
+                'total_cents': TransactionRollup.total_cents + statement.excluded.total_cents
+            }
+        )
+        db.execute(statement)
+    else:
+        for value in values:
+            rollup = db.get(TransactionRollup, (value['month'], value['category'], value['sign']))
+            if rollup is None:
+                db.add(TransactionRollup(**value))
+            else:
+                rollup.count += value['count']
+                rollup.total_cents += value['total_cents']
+        db.flush()
+
+    # Las celdas que se quedan sin transacciones no aportan nada a las estadísticas
+    if direction < 0:
+        db.query(TransactionRollup).filter(TransactionRollup.count <= 0).delete(synchronize_session=False)
+
+
+def clear_rollup(db: Session) -> None:
+    """Vacía el agregado (p. ej. al eliminar todas las transacciones)."""
+    db.query(TransactionRollup).delete(synchronize_session=False)
+
+
+def raw_cells_select(dialect_name: str, *filters):
+    """
+    Consulta que agrupa la tabla de transacciones con la misma clave que el
+    agregado: (mes, categoría, signo) -> count, total_cents.
+
+    Args:
+        dialect_name: Nombre del dialecto SQLAlchemy
+        filters: Condiciones opcionales sobre Transaction
+
+    Returns:
+        Select de SQLAlchemy
+    """
+    month = month_expression(dialect_name)
+    category = func.coalesce(Transaction.category, '')
+    sign = sign_expression()
+    return select(
+        month.label('month'),
+        category.label('category'),
+        sign.label('sign'),
+        func.count(Transaction.id).label('count'),
+        func.sum(Transaction.amount_cents).label('total_cents')
+    ).where(*filters).group_by(month, category, sign)
+
+
+def rebuild_rollup(db: Session) -> int:
+    """
+    Recalcula el agregado completo a partir de la tabla de transacciones.
+
+    Args:
+        db: Sesión de base de datos
+
+    Returns:
+        Número de celdas del agregado
+    """
+    clear_rollup(db)
+    db.execute(
+        insert(TransactionRollup).from_select(
+            ['month', 'category', 'sign', 'count', 'total_cents'], raw_cells_select(db.get_bind().dialect.name)
+        )
+    )
+    cells = db.query(func.count()).select_from(TransactionRollup).scalar()
+    logger.info(f"Agregado de estadísticas reconstruido: {cells} celdas")
+    return cells
+
+
+def ensure_rollup(db: Session) -> None:
+    """
+    Reconstruye el agregado si está vacío pero ya existen transacciones
+    (p. ej. la primera vez que arranca una base de datos anterior al agregado).
+
+    Args:
+        db: Sesión de base de datos
+    """
+    has_rollup = db.query(TransactionRollup.month).first() is not None
+    has_transactions = db.query(Transaction.id).first() is not None
+    if has_transactions and not has_rollup:
+        rebuild_rollup(db)
+        db.commit()
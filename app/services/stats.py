@@ -0,0 +1,220 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.transaction import Transaction
+from app.models.transaction_rollup import TransactionRollup
+from app.schemas.transaction import TransactionStats, CategoryStats, MonthlyStats
+from app.services.rollup import raw_cells_select
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _month_start(day: date) -> date:
+    """Primer día del mes de una fecha."""
+    return day.replace(day=1)
+
+
+def _next_month_start(day: date) -> date:
+    """Primer día del mes siguiente a una fecha."""
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_date_range(
+    start_date: Optional[date],
+    end_date: Optional[date]
+) -> Tuple[Optional[Tuple[Optional[str], Optional[str]]], List[Tuple[Optional[date], Optional[date]]]]:
+    """
+    Divide un rango de fechas en meses completos (servidos desde el agregado)
+    y tramos parciales en los extremos (servidos desde la tabla de transacciones).
+
+    Args:
+        start_date: Fecha de inicio opcional (inclusive)
+        end_date: Fecha de fin opcional (inclusive)
+
+    Returns:
+        Tupla (rango de meses 'YYYY-MM' inclusive o None, tramos de fechas parciales)
+    """
+    if start_date and end_date and start_date > end_date:
+        return None, []
+
+    # Primer y último día cubiertos por meses completos
+    full_start = start_date
+    if start_date and start_date.day != 1:
+        full_start = _next_month_start(start_date)
+    full_end = end_date
+    if end_date and _next_month_start(end_date) - timedelta(days=1) != end_date:
+        full_end = _month_start(end_date) - timedelta(days=1)
+
+    if full_start and full_end and full_start > full_end:
+        # No hay ningún mes completo dentro del rango
+        return None, [(start_date, end_date)]
+
+    months = (
+        full_start.strftime('%Y-%m') if full_start else None,
+        full_end.strftime('%Y-%m') if full_end else None
+    )
+    edges = []
+    if start_date and full_start != start_date:
+        edges.append((start_date, full_start - timedelta(days=1)))
+    if end_date and full_end != end_date:
+        edges.append((full_end + timedelta(days=1), end_date))
+    return months, edges
+
+
+def stats_statements(dialect_name: str, start_date: Optional[date], end_date: Optional[date]) -> List:
+    """
+    Construye las consultas necesarias para las estadísticas de un rango.
+
+    Los meses completos se leen del agregado transaction_rollups y solo los
+    meses parciales de los extremos se agrupan desde la tabla de transacciones.
+    Todas las consultas devuelven filas (month, category, sign, count, total_cents).
+
+    Args:
+        dialect_name: Nombre del dialecto SQLAlchemy
+        start_date: Fecha de inicio opcional (inclusive)
+        end_date: Fecha de fin opcional (inclusive)
+
+    Returns:
+        Lista de Select de SQLAlchemy (como máximo dos)
+    """
+    months, edges = split_date_range(start_date, end_date)
+    logger.debug(f"Estadísticas: meses del agregado={months}, tramos parciales={edges}")
+    statements = []
+
+    # Meses completos desde el agregado
+    if months:
+        statement = select(
+            TransactionRollup.month,
+            TransactionRollup.category,
+            TransactionRollup.sign,
+            TransactionRollup.count,
+            TransactionRollup.total_cents
+        ).where(TransactionRollup.count > 0)
+        if months[0]:
+            statement = statement.where(TransactionRollup.month >= months[0])
+        if months[1]:
+            statement = statement.where(TransactionRollup.month <= months[1])
+        statements.append(statement)
+
+    # Meses parciales desde la tabla de transacciones, en una sola consulta
+    if edges:
+        conditions = []
+        for edge_start, edge_end in edges:
+            bounds = []
+            if edge_start:
+                bounds.append(Transaction.date >= edge_start)
+            if edge_end:
+                bounds.append(Transaction.date <= edge_end)
+            conditions.append(and_(*bounds))
+        statements.append(raw_cells_select(dialect_name, or_(*conditions)))
+
+    return statements
+
+
+def build_stats(rows: Iterable) -> TransactionStats:
+    """
+    Combina filas (month, category, sign, count, total_cents) en las
+    estadísticas de respuesta.
+
+    Los totales se suman en céntimos enteros, de forma exacta, y solo se
+    convierten a unidades al construir la respuesta.
+
+    Args:
+        rows: Filas devueltas por las consultas de stats_statements
+
+    Returns:
+        Estadísticas agregadas
+    """
+    cells: Dict[Tuple[str, str, int], List] = {}
+    for month, category, sign, count, total_cents in rows:
+        cell = cells.setdefault((month, category, sign), [0, 0])
+        cell[0] += count
+        # SUM de BIGINT en PostgreSQL devuelve NUMERIC (Decimal)
+        cell[1] += int(total_cents)
+
+    total_income = sum(total for (_, _, sign), (_, total) in cells.items() if sign > 0)
+    total_expenses = sum(total for (_, _, sign), (_, total) in cells.items() if sign < 0)
+    net_balance = total_income + total_expenses
+
+    category_totals: Dict[str, List] = {}
+    month_totals: Dict[str, List] = {}
+    for (month, category, _), (count, total) in cells.items():
+        for key, totals in ((category, category_totals), (month, month_totals)):
+            entry = totals.setdefault(key, [0, 0])
+            entry[0] += count
+            entry[1] += total
+
+    by_category = [
+        CategoryStats(
+            category=category or "Sin categoría",
+            count=count,
+            total=total / 100,
+            average=round(total / count / 100, 2)
+        )
+        for category, (count, total) in sorted(category_totals.items())
+    ]
+
+    by_month = [
+        MonthlyStats(
+            month=month,
+            count=count,
+            total=total / 100
+        )
+        for month, (count, total) in sorted(month_totals.items())
+    ]
+
+    return TransactionStats(
+        total_transactions=sum(count for count, _ in category_totals.values()),
+        total_income=total_income / 100,
+        total_expenses=total_expenses / 100,
+        net_balance=net_balance / 100,
+        by_category=by_category,
+        by_month=by_month
+    )
+
+
+def compute_transaction_stats(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> TransactionStats:
+    """
+    Calcula las estadísticas agregadas sin cargar filas ORM.
+
+    Args:
+        db: Sesión de base de datos
+        start_date: Fecha de inicio opcional (inclusive)
+        end_date: Fecha de fin opcional (inclusive)
+
+    Returns:
+        Estadísticas de las transacciones del rango
+    """
+    rows = []
+    for statement in stats_statements(db.get_bind().dialect.name, start_date, end_date):
+        rows.extend(db.execute(statement).all())
+    return build_stats(rows)
+
+
+async def compute_transaction_stats_async(
+    db: AsyncSession,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> TransactionStats:
+    """
+    Versión asíncrona de compute_transaction_stats.
+
+    Args:
+        db: Sesión asíncrona de base de datos
+        start_date: Fecha de inicio opcional (inclusive)
+        end_date: Fecha de fin opcional (inclusive)
+
+    Returns:
+        Estadísticas de las transacciones del rango
+    """
+    rows = []
+    for statement in stats_statements(db.bind.dialect.name, start_date, end_date):
+        rows.extend((await db.execute(statement)).all())
+    return build_stats(rows)
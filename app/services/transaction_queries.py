@@ -0,0 +1,127 @@
+from datetime import date
+from decimal import ROUND_CEILING, ROUND_FLOOR
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, func, or_, select
+from app.models.transaction import Transaction
+from app.schemas.transaction import TransactionListResponse
+from app.services.amounts import amount_to_cents
+from app.services.concept_search import concept_search_filter
+from app.services.pagination import encode_cursor, decode_cursor
+
+
+def transaction_filters(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    q: Optional[str] = None
+) -> List:
+    """
+    Construye las condiciones de filtrado de GET /transactions.
+
+    Args:
+        start_date: Fecha de inicio (inclusive)
+        end_date: Fecha de fin (inclusive)
+        category: Categoría exacta
+        min_amount: Monto mínimo
+        max_amount: Monto máximo
+        q: Texto contenido en el concepto (sin distinguir mayúsculas)
+
+    Returns:
+        Lista de condiciones SQLAlchemy sobre Transaction
+    """
+    filters = []
+    if start_date:
+        filters.append(Transaction.date >= start_date)
+    if end_date:
+        filters.append(Transaction.date <= end_date)
+    if category:
+        filters.append(Transaction.category == category)
+    if min_amount is not None:
+        filters.append(Transaction.amount_cents >= amount_to_cents(min_amount, ROUND_CEILING))
+    if max_amount is not None:
+        filters.append(Transaction.amount_cents <= amount_to_cents(max_amount, ROUND_FLOOR))
+    if q:
+        filters.append(concept_search_filter(q))
+    return filters
+
+
+def page_statements(
+    filters: List,
+    skip: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    include_total: bool = True
+) -> Tuple[Optional[object], object]:
+    """
+    Construye las consultas de conteo y de página de GET /transactions.
+
+    La página se ordena por (date, id) descendente, cubierto por
+    idx_transaction_date_id. Con cursor se aplica un filtro keyset y se ignora
+    skip. Se pide un registro extra para saber si hay página siguiente.
+
+    Args:
+        filters: Condiciones de transaction_filters
+        skip: Registros a saltar (modo offset)
+        limit: Tamaño de página
+        cursor: Cursor opaco de la página anterior (modo cursor)
+        include_total: Si se debe construir la consulta de conteo
+
+    Returns:
+        Tupla (Select de conteo o None, Select de la página)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    count_statement = None
+    if include_total:
+        count_statement = select(func.count(Transaction.id)).where(*filters)
+
+    page = select(Transaction).where(*filters).order_by(Transaction.date.desc(), Transaction.id.desc())
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        page = page.where(
+            or_(
+                Transaction.date < cursor_date,
+                and_(Transaction.date == cursor_date, Transaction.id < cursor_id)
+            )
+        )
+        skip = 0
+
+    return count_statement, page.offset(skip).limit(limit + 1)
+
+
+def build_page(
+    transactions: List[Transaction],
+    total: Optional[int],
+    skip: int,
+    limit: int,
+    cursor: Optional[str] = None
+) -> TransactionListResponse:
+    """
+    Construye la respuesta paginada a partir de las filas de page_statements.
+
+    Args:
+        transactions: Filas devueltas (hasta limit + 1)
+        total: Total de registros o None
+        skip: Registros saltados solicitados
+        limit: Tamaño de página
+        cursor: Cursor usado para la página
+
+    Returns:
+        Respuesta paginada con next_cursor si hay más registros
+    """
+    next_cursor = None
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        next_cursor = encode_cursor(transactions[-1].date, transactions[-1].id)
+
+    return TransactionListResponse(
+        transactions=transactions,
+        total=total,
+        skip=0 if cursor else skip,
+        limit=limit,
+        next_cursor=next_cursor,
+        cursor=cursor
+    )
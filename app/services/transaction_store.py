@@ -0,0 +1,137 @@
+from typing import Dict, List, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models.transaction import Transaction
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Número máximo de claves por consulta IN al buscar duplicados
+KEY_LOOKUP_BATCH_SIZE = 1000
+
+
+def supports_on_conflict(db: Session) -> bool:
+    """Indica si el dialecto admite INSERT ... ON CONFLICT DO NOTHING RETURNING."""
+    return db.get_bind().dialect.name in ("postgresql", "sqlite")
+
+
+def begin_savepoint(db: Session):
+    """
+    Abre un savepoint dentro de la transacción en curso.
+
+    pysqlite no abre su transacción hasta el primer INSERT/UPDATE: un SAVEPOINT
+    anterior quedaría fuera de ella y su RELEASE confirmaría los cambios. En
+    SQLite se abre antes la transacción de forma explícita.
+
+    Args:
+        db: Sesión de base de datos
+
+    Returns:
+        Transacción anidada de SQLAlchemy (usar con with)
+    """
+    if db.get_bind().dialect.name == "sqlite" and not db.connection().connection.dbapi_connection.in_transaction:
+        db.execute(text("BEGIN"))
+    return db.begin_nested()
+
+
+def fetch_existing_keys(db: Session, keys: Set[int]) -> Set[int]:
+    """
+    Obtiene las claves de duplicado del conjunto que ya están guardadas,
+    mediante búsquedas puntuales en el índice único idx_transaction_dedup_key.
+
+    Args:
+        db: Sesión de base de datos
+        keys: Claves de duplicado a comprobar
+
+    Returns:
+        Set de claves existentes
+    """
+    pending = list(keys)
+    existing = set()
+    for start in range(0, len(pending), KEY_LOOKUP_BATCH_SIZE):
+        chunk = pending[start:start + KEY_LOOKUP_BATCH_SIZE]
+        rows = db.query(Transaction.dedup_key).filter(Transaction.dedup_key.in_(chunk)).all()
+        existing.update(row[0] for row in rows)
+    return existing
+
+
+def split_duplicates(db: Session, batch: List[Dict], check_database: bool = True) -> Tuple[List[Dict], int]:
+    """
+    Separa las transacciones nuevas de las duplicadas de un bloque según su
+    dedup_key.
+
+    Se consideran duplicadas las que se repiten dentro del propio bloque (se
+    conserva la primera aparición) y, con check_database, las que ya existen
+    en la base de datos. Cuando el INSERT resuelve los conflictos con
+    ON CONFLICT (dedup_key) DO NOTHING no hace falta consultar la base de datos:
+    las filas rechazadas se cuentan al insertar.
+
+    Args:
+        db: Sesión de base de datos
+        batch: Transacciones parseadas del bloque
+        check_database: Si es True descarta también las claves ya guardadas
+
+    Returns:
+        Tupla (transacciones nuevas, número de duplicadas)
+    """
+    seen = set()
+    if check_database:
+        seen = fetch_existing_keys(db, {trans_data['dedup_key'] for trans_data in batch})
+    new_transactions = []
+    duplicates = 0
+
+    for trans_data in batch:
+        key = trans_data['dedup_key']
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        new_transactions.append(trans_data)
+
+    logger.debug("Bloque deduplicado: %d nuevas, %d duplicadas", len(new_transactions), duplicates)
+    return new_transactions, duplicates
+
+
+def insert_transactions(db: Session, rows: List[Dict], batch_size: int = 1000) -> List[Dict]:
+    """
+    Inserta transacciones nuevas en bloque dentro de la transacción actual.
+
+    En PostgreSQL y SQLite usa INSERT ... VALUES multi-fila por lotes con
+    ON CONFLICT (dedup_key) DO NOTHING sobre el índice único
+    idx_transaction_dedup_key y RETURNING, de modo que se devuelven exactamente
+    las filas insertadas. En otros dialectos se mantiene el camino ORM
+    (add_all + flush).
+
+    Args:
+        db: Sesión de base de datos
+        rows: Diccionarios con date, concept, amount_cents, dedup_key, category y
+            source
+        batch_size: Número de filas por sentencia INSERT
+
+    Returns:
+        Filas insertadas (date, category y amount_cents de cada una)
+    """
+    if not rows:
+        return []
+
+    if not supports_on_conflict(db):
+        db.add_all([Transaction(**row) for row in rows])
+        db.flush()
+        return rows
+
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    inserted = []
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start:start + batch_size]
+        statement = (
+            dialect_insert(Transaction)
+            .values(chunk)
+            .on_conflict_do_nothing(index_elements=['dedup_key'])
+            .returning(Transaction.date, Transaction.category, Transaction.amount_cents)
+        )
+        inserted.extend(dict(row._mapping) for row in db.execute(statement))
+
+    logger.debug("Insertadas %d de %d transacciones en lotes de %d", len(inserted), len(rows), batch_size)
+    return inserted
@@ -0,0 +1,77 @@
+"""
+Micro-benchmark del parsing de montos: TransactionCSVParser.parse_amount
+(valor a valor) frente a AmountDecoder (columna completa, céntimos exactos).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_amounts --rows 100000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.services.amounts import AmountDecoder, cents_to_amount
+from app.services.csv_parser import TransactionCSVParser
+
+
+def generate_amounts(rows: int, seed: int = 0) -> pd.Series:
+    """
+    Genera montos con el aspecto del extracto bancario: coma decimal, punto de
+    miles, signo y símbolo de euro (carácter '€' o byte \\x80 leído en latin-1).
+
+    Args:
+        rows: Número de montos
+        seed: Semilla del generador aleatorio
+
+    Returns:
+        Serie de strings
+    """
+    rng = np.random.default_rng(seed)
+    cents = rng.integers(-200000, 50000, size=rows)
+    symbols = rng.choice(['€', '\x80', ''], size=rows)
+    values = []
+    for value, symbol in zip(cents.tolist(), symbols.tolist()):
+        units, fraction = divmod(abs(value), 100)
+        sign = '-' if value < 0 else ''
+        values.append(f"{sign}{units:,}".replace(',', '.') + f",{fraction:02d}{symbol}")
+    return pd.Series(values)
+
+
+def best_of(repeat: int, func) -> float:
+    """Mejor tiempo en segundos de varias ejecuciones."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--rows', type=int, default=100000, help="Número de montos")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="Repeticiones (se toma la mejor)")
+    args = arg_parser.parse_args()
+
+    amounts = generate_amounts(args.rows)
+    parser = TransactionCSVParser()
+    decoder = AmountDecoder()
+
+    # Equivalencia: mismos montos que la función actual
+    expected = [parser.parse_amount(value) for value in amounts]
+    cents, invalid = decoder.decode(amounts)
+    assert not invalid.any(), "El decodificador rechazó montos válidos"
+    assert cents_to_amount(cents).tolist() == expected, "Los montos no coinciden con parse_amount"
+
+    baseline = best_of(args.repeat, lambda: [parser.parse_amount(value) for value in amounts])
+    vectorized = best_of(args.repeat, lambda: decoder.decode(amounts))
+    distinct = amounts.iloc[:min(args.rows, 5000)].sample(args.rows, replace=True, random_state=0).reset_index(drop=True)
+    repeated = best_of(args.repeat, lambda: decoder.decode(distinct))
+
+    print(f"Montos: {args.rows}")
+    print(f"  parse_amount (valor a valor):       {baseline:8.3f} s")
+    print(f"  AmountDecoder.decode:               {vectorized:8.3f} s  (x{baseline / vectorized:.1f})")
+    print(f"  AmountDecoder.decode (5000 únicos): {repeated:8.3f} s  (x{baseline / repeated:.1f})")
+
+
+if __name__ == '__main__':
+    main()